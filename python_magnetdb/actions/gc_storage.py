@@ -0,0 +1,71 @@
+from datetime import timedelta
+from functools import reduce
+from operator import and_
+
+from django.db.models import Q
+from django.utils import timezone
+
+from python_magnetdb.models import StorageAttachment
+from python_magnetdb.storage import get_storage
+
+
+def _referenced_object_names(keys=None, excluded=None) -> set:
+    db_query = StorageAttachment.objects
+    if keys is not None:
+        db_query = db_query.filter(key__in=keys)
+    if excluded is not None:
+        db_query = db_query.exclude(id__in=excluded.values('id'))
+    return {StorageAttachment.object_name(key, codec) for (key, codec) in db_query.values_list('key', 'codec')}
+
+
+def orphan_attachments(grace: timedelta):
+    """attachment rows no model points to anymore (left behind by SET_NULL relations or unused uploads)"""
+    relations = [relation for relation in StorageAttachment._meta.related_objects if relation.one_to_many]
+    return StorageAttachment.objects.filter(
+        reduce(and_, [Q(**{f"{relation.name}__isnull": True}) for relation in relations]),
+        created_at__lt=timezone.now() - grace,
+    )
+
+
+def collect_garbage(dry_run: bool = False, grace: timedelta = timedelta(hours=24), batch_size: int = 1000,
+                    orphan_rows: bool = False, log=print) -> dict:
+    """remove the stored objects no attachment row refers to
+
+    Several rows can share a content addressed object, an object is only garbage once no row has its key. Objects
+    modified during the grace period are kept: they may belong to an upload whose row is not saved yet.
+    """
+    report = {'orphan_rows': 0, 'objects': 0, 'bytes': 0, 'failed': 0}
+    orphans = None
+    if orphan_rows:
+        orphans = orphan_attachments(grace)
+        report['orphan_rows'] = orphans.count()
+        log(f"{report['orphan_rows']} orphan attachment rows")
+        if not dry_run:
+            orphans.delete()
+            orphans = None
+
+    # in dry run the orphan rows are still there, they must not keep their objects alive in the report
+    referenced = _referenced_object_names(excluded=orphans)
+    limit = timezone.now() - grace
+    garbage = [
+        obj for obj in get_storage().list()
+        if obj.name not in referenced and obj.last_modified < limit
+    ]
+    for start in range(0, len(garbage), batch_size):
+        batch = garbage[start:start + batch_size]
+        # rows may have been created for these keys since the objects were listed
+        keys = {obj.name.split('.')[0] for obj in batch}
+        still_referenced = _referenced_object_names(keys, excluded=orphans)
+        batch = [obj for obj in batch if obj.name not in still_referenced]
+        if not dry_run:
+            errors = get_storage().remove_many([obj.name for obj in batch])
+            for (name, message) in errors:
+                log(f"failed to remove {name}: {message}")
+            failed = {name for (name, _) in errors}
+            report['failed'] += len(failed)
+            batch = [obj for obj in batch if obj.name not in failed]
+        report['objects'] += len(batch)
+        report['bytes'] += sum(obj.size for obj in batch)
+        log(f"{'would remove' if dry_run else 'removed'} {report['objects']}/{len(garbage)} objects, "
+            f"{report['bytes']} bytes")
+    return report
@@ -2,8 +2,18 @@ import json
 import os
 import shutil
 
-from python_magnetdb.actions.generate_simulation_config import generate_magnet_config
+from python_magnetdb.actions.generate_simulation_config import format_magnet_config, format_material
 from python_magnetdb.models.magnet import Magnet
+from python_magnetdb.models.material import Material
+from python_magnetdb.utils.staging import StagingPlan
+
+# everything a magnet directory is written from, relative to the magnet
+magnet_prefetch = [
+    "magnetpart_set__part__material",
+    "magnetpart_set__part__hts_attachment",
+    "magnetpart_set__part__shape_attachment",
+    "magnetpart_set__part__cadattachment_set__attachment",
+]
 
 
 def mkdir(dir):
@@ -13,32 +23,38 @@ def mkdir(dir):
         pass
 
 
-def generate_magnet_directory(magnet_id, directory):
-    magnet = Magnet.objects.prefetch_related(
-        "magnetpart_set__part",
-        "magnetpart_set__part__cadattachment_set__attachment",
-        "magnetpart_set__part__material",
-        "sitemagnet_set__site",
-        "cadattachment_set__attachment",
-    ).get(id=magnet_id)
+def prepare_base_directory(directory):
     mkdir(f"{directory}/data")
     mkdir(f"{directory}/data/geometries")
     mkdir(f"{directory}/data/cad")
-    print(f"generate_magnet_directory: {os.getcwd()}/flow_params.json")
+    print(f"prepare_base_directory: {os.getcwd()}/flow_params.json")
     shutil.copyfile(f"{os.getcwd()}/flow_params.json", f"{directory}/flow_params.json")
+
+
+def plan_magnet_files(magnet: Magnet, directory, plan: StagingPlan):
+    """write the geometries of a magnet and its parts, adding the files they refer to to the plan"""
     with open(f"{directory}/data/geometries/{magnet.name}.yaml", "w") as f:
         f.write(magnet.geometry_config_to_yaml)
     for magnet_part in magnet.magnetpart_set.all():
         # if not magnet_part.active:
         #     continue
-        with open(f"{directory}/data/geometries/{magnet_part.part.name}.yaml", "w") as f:
-            f.write(magnet_part.part.geometry_config_to_yaml)
-        if magnet_part.part.cadattachment_set.all():
-            for cad in magnet_part.part.cadattachment_set.all():
-                cad.attachment.download(
-                    f"{directory}/data/cad/{cad.attachment.filename}"
-                )
+        part = magnet_part.part
+        with open(f"{directory}/data/geometries/{part.name}.yaml", "w") as f:
+            f.write(part.geometry_config_to_yaml)
+        for attachment in (part.hts_attachment, part.shape_attachment):
+            if attachment is not None:
+                plan.add(attachment, f"{directory}/data/geometries/{attachment.filename}")
+        for cad in part.cadattachment_set.all():
+            plan.add(cad.attachment, f"{directory}/data/cad/{cad.attachment.filename}")
+
+
+def generate_magnet_directory(magnet_id, directory):
+    magnet = Magnet.objects.prefetch_related(*magnet_prefetch).get(id=magnet_id)
+    prepare_base_directory(directory)
+    plan = StagingPlan()
+    plan_magnet_files(magnet, directory, plan)
+    plan.run()
     with open(f"{directory}/config.json", "w+") as file:
-        config = generate_magnet_config(magnet_id)
+        config = format_magnet_config(magnet, format_material(Material.objects.get(name="MAT_ISOLANT")))
         file.write(json.dumps(config))
         return config
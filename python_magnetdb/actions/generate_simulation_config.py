@@ -29,8 +29,12 @@ def generate_magnet_config(magnet_id):
     print(
         f"generate_magnet_config[{magnet_id}]: magnet={magnet.name}"
     )
+    return format_magnet_config(magnet, format_material(Material.objects.get(name="MAT_ISOLANT")))
+
+
+def format_magnet_config(magnet, insulator_payload):
+    """config of a magnet whose parts and their materials are already loaded"""
     payload = {"geom": f"{magnet.name}.yaml"}
-    insulator_payload = format_material(Material.objects.get(name="MAT_ISOLANT"))
     for magnet_part in magnet.magnetpart_set.all():
         # if not magnet_part.active:
         #     continue
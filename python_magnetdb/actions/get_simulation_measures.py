@@ -21,9 +21,39 @@ def find_measures_files(path: str):
     return found_files
 
 
+def _format_measures(csv, measure: str, measures_names: list):
+    return {
+        'measure': measure,
+        'available_measures': measures_names,
+        'columns': csv.columns.tolist(),
+        'rows': csv.values.tolist(),
+    }
+
+
+def get_manifest_measures(simulation: Simulation, measure_name: str=None):
+    """measures of a simulation stored file by file, only the values.csv asked for is downloaded"""
+    measures_files = {}
+    for file in simulation.simulationoutputfile_set.select_related('attachment').order_by('path'):
+        if file.path.endswith('.measures/values.csv'):
+            measures_files[file.path.split('/')[-2][:-9]] = file
+    measures_names = list(measures_files.keys())
+
+    for (name, file) in measures_files.items():
+        if measure_name is None or name == measure_name:
+            response = file.attachment.download()
+            try:
+                return _format_measures(read_csv(response), name, measures_names)
+            finally:
+                response.close()
+                response.release_conn()
+    return None
+
+
 def get_simulation_measures(simulation_id: int, measure_name: str=None):
     print(f"get_simulation_measures... simulation_id:{simulation_id}, measure:{measure_name}")
     simulation = Simulation.objects.prefetch_related('output_attachment').get(id=simulation_id)
+    if simulation.simulationoutputfile_set.exists():
+        return get_manifest_measures(simulation, measure_name)
     if simulation.output_attachment is None:
         return None
 
@@ -38,10 +68,5 @@ def get_simulation_measures(simulation_id: int, measure_name: str=None):
         for (index, measures_path) in enumerate(measures_files):
             if measure_name is None or measures_path.endswith(f"{measure_name}.measures"):
                 csv = read_csv(f"{measures_path}/values.csv")
-                return {
-                    'measure': measures_path.split('/').pop()[:-9],
-                    'available_measures': measures_names,
-                    'columns': csv.columns.tolist(),
-                    'rows': csv.values.tolist(),
-                }
+                return _format_measures(csv, measures_path.split('/').pop()[:-9], measures_names)
     return None
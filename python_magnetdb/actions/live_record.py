@@ -0,0 +1,139 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from os import getenv
+from os.path import splitext
+from traceback import print_exception
+
+import pandas as pd
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+
+from python_magnetdb.actions.process_record import process_record
+from python_magnetdb.models import Record, RecordChunk, StorageAttachment
+from python_magnetdb.utils.record_data import read_record_chunk, read_record_parquet, write_record_parquet, \
+    write_record_txt, record_storage_codec
+
+# a live record holding more chunks than this gets them merged by the periodic compaction
+record_chunks_compaction_threshold = int(getenv('RECORD_CHUNKS_COMPACTION_THRESHOLD') or 16)
+# a live record without any append for this long is finalized by the periodic compaction
+record_live_timeout = timedelta(seconds=int(getenv('RECORD_LIVE_TIMEOUT') or 3600))
+
+
+class ChunkOutOfOrder(ValueError):
+    """a chunk arrived after a chunk of a greater sequence, its rows cannot be appended anymore"""
+
+
+def _upload_chunk(record: Record, sequence: int, data: pd.DataFrame) -> StorageAttachment:
+    with tempfile.TemporaryDirectory() as tempdir:
+        file_path = os.path.join(tempdir, f"{record.id}.{sequence}.parquet")
+        write_record_parquet(data, file_path)
+        return StorageAttachment.raw_upload(os.path.basename(file_path), "application/vnd.apache.parquet", file_path)
+
+
+def read_chunk(chunk: RecordChunk) -> pd.DataFrame:
+    return read_record_parquet(BytesIO(chunk.attachment.download().read()))
+
+
+def append_record_chunk(record: Record, sequence: int, raw: bytes) -> RecordChunk:
+    """store rows appended to a live record, a chunk whose sequence was already received is ignored so clients
+    can safely retry, one arriving after a greater sequence raises ChunkOutOfOrder"""
+    received = record.recordchunk_set.filter(sequences__contains=[sequence]).first()
+    if received is not None:
+        return received
+    last = record.recordchunk_set.order_by('-sequence').first()
+    if last is not None and sequence < last.sequence:
+        raise ChunkOutOfOrder(f"Chunk {sequence} arrived after chunk {last.sequence}, its rows were not appended")
+
+    first = record.recordchunk_set.order_by('sequence').first()
+    t0 = None if first is None else pd.Timestamp(timezone.make_naive(first.first_timestamp))
+    data = read_record_chunk(BytesIO(raw), t0)
+    if first is not None and list(data.columns) != first.columns:
+        raise ValueError(f"Columns differ from the previous chunks: {list(data.columns)}")
+    # t are whole seconds, a chunk may start in the second the previous one ended in
+    if last is not None and data['t'].iloc[0] < last.last_t:
+        raise ValueError("Rows must be appended in time order")
+
+    attachment = _upload_chunk(record, sequence, data)
+    try:
+        with transaction.atomic():
+            # finalizing and compacting lock the record as well
+            if not Record.objects.select_for_update().get(id=record.id).live:
+                raise ValueError("Record is not live")
+            # a greater sequence may have been appended concurrently
+            if record.recordchunk_set.filter(sequence__gt=sequence).exists():
+                raise ChunkOutOfOrder(f"Chunk {sequence} arrived after a greater sequence, its rows were not appended")
+            return RecordChunk.objects.create(
+                record=record, sequence=sequence, sequences=[sequence], attachment=attachment,
+                columns=list(data.columns), rows=len(data),
+                first_timestamp=timezone.make_aware(data['timestamp'].iloc[0].to_pydatetime()),
+                first_t=float(data['t'].iloc[0]), last_t=float(data['t'].iloc[-1]),
+            )
+    except ValueError:
+        attachment.delete()
+        raise
+    except IntegrityError:
+        # concurrent retry of the same chunk
+        attachment.delete()
+        return record.recordchunk_set.get(sequence=sequence)
+
+
+def compact_record_chunks(record: Record):
+    """merge the chunks of a live record into a single one"""
+    with transaction.atomic():
+        if not Record.objects.select_for_update().get(id=record.id).live:
+            return
+        chunks = list(record.recordchunk_set.prefetch_related('attachment').order_by('sequence'))
+        if len(chunks) < 2:
+            return
+        data = pd.concat([read_chunk(chunk) for chunk in chunks], ignore_index=True)
+        attachment = _upload_chunk(record, chunks[-1].sequence, data)
+        StorageAttachment.objects.filter(id__in=[chunk.attachment_id for chunk in chunks]).delete()
+        RecordChunk.objects.create(
+            record=record, sequence=chunks[-1].sequence,
+            sequences=[number for chunk in chunks for number in chunk.sequences], attachment=attachment,
+            columns=chunks[0].columns, rows=len(data), first_timestamp=chunks[0].first_timestamp,
+            first_t=chunks[0].first_t, last_t=chunks[-1].last_t,
+        )
+
+
+def finalize_live_record(record: Record) -> Record:
+    """write the rows of a live record as its attachment, then build its derived files like any uploaded record"""
+    with tempfile.TemporaryDirectory() as tempdir:
+        with transaction.atomic():
+            record = Record.objects.select_for_update().get(id=record.id)
+            if not record.live:
+                raise ValueError("Record is not live")
+            chunks = list(record.recordchunk_set.prefetch_related('attachment').order_by('sequence'))
+            if len(chunks) == 0:
+                raise ValueError("Record has no rows")
+
+            data = pd.concat([read_chunk(chunk) for chunk in chunks], ignore_index=True)
+            file_path = os.path.join(tempdir, f"{splitext(record.name)[0]}.txt")
+            write_record_txt(data, file_path, record.name)
+            record.attachment = StorageAttachment.raw_upload(
+                os.path.basename(file_path), 'text/tsv', file_path, record_storage_codec
+            )
+            record.live = False
+            record.save()
+            StorageAttachment.objects.filter(id__in=[chunk.attachment_id for chunk in chunks]).delete()
+
+        try:
+            process_record(record, file_path)
+        except Exception as err:
+            print_exception(None, err, err.__traceback__)
+    return record
+
+
+def compact_live_records():
+    """finalize the live records that stopped receiving rows, merge the chunks of the others"""
+    for record in Record.objects.filter(live=True):
+        try:
+            last = record.recordchunk_set.order_by('-sequence').first()
+            if last is not None and last.created_at < timezone.now() - record_live_timeout:
+                finalize_live_record(record)
+            elif record.recordchunk_set.count() > record_chunks_compaction_threshold:
+                compact_record_chunks(record)
+        except Exception as err:
+            print_exception(None, err, err.__traceback__)
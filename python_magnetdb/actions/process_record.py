@@ -0,0 +1,96 @@
+import os
+import tempfile
+from functools import reduce
+from io import BytesIO
+from operator import or_
+from os.path import splitext
+
+from django.db.models import Q
+
+from python_magnetdb.models import Record, StorageAttachment, RecordColumnStatistics, RecordEvent
+from python_magnetdb.utils.record_data import read_record_txt, write_record_parquet, build_offset_index
+from python_magnetdb.utils.record_events import detect_events
+from python_magnetdb.utils.record_pyramid import build_pyramid, write_pyramid
+from python_magnetdb.utils.record_statistics import compute_column_statistics
+
+
+def _upload_derived_file(record: Record, suffix: str, content_type: str, write):
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = f"{splitext(record.attachment.filename or record.name)[0]}{suffix}"
+        file_path = os.path.join(tempdir, filename)
+        write(file_path)
+        return StorageAttachment.raw_upload(filename, content_type, file_path)
+
+
+def generate_record_parquet(record: Record, data, raw: bytes):
+    record.parquet_attachment = _upload_derived_file(
+        record, ".parquet", "application/vnd.apache.parquet",
+        lambda file_path: write_record_parquet(data, file_path)
+    )
+
+
+def generate_record_pyramid(record: Record, data, raw: bytes):
+    pyramid = build_pyramid(data)
+    if pyramid.empty:
+        record.pyramid_attachment = None
+        return
+    record.pyramid_attachment = _upload_derived_file(
+        record, ".pyramid.parquet", "application/vnd.apache.parquet",
+        lambda file_path: write_pyramid(pyramid, file_path)
+    )
+
+
+def generate_record_statistics(record: Record, data, raw: bytes):
+    record.recordcolumnstatistics_set.all().delete()
+    RecordColumnStatistics.objects.bulk_create([
+        RecordColumnStatistics(record=record, **statistics) for statistics in compute_column_statistics(data)
+    ])
+
+
+def generate_record_offset_index(record: Record, data, raw: bytes):
+    # an empty index marks files whose rows cannot be located, visualize then reads them entirely
+    record.offset_index = build_offset_index(raw, data) or {}
+
+
+def generate_record_events(record: Record, data, raw: bytes):
+    record.recordevent_set.all().delete()
+    RecordEvent.objects.bulk_create([RecordEvent(record=record, **event) for event in detect_events(data)])
+
+
+# processing steps, in the order they are run, the ones run on a record are listed in its processed_steps
+RECORD_PROCESSING_STEPS = {
+    'parquet': generate_record_parquet,
+    'pyramid': generate_record_pyramid,
+    'statistics': generate_record_statistics,
+    'offset_index': generate_record_offset_index,
+    'events': generate_record_events,
+}
+
+
+def missing_steps_filter(steps) -> Q:
+    """records where one of steps has not been run yet"""
+    return reduce(or_, [~Q(processed_steps__contains=[step]) for step in steps])
+
+
+def process_record(record: Record, source=None, steps=None):
+    """build the derived files of a record, source being the raw file path (downloaded from storage if None)"""
+    if source is None:
+        raw = record.attachment.download().read()
+    else:
+        with open(source, 'rb') as f:
+            raw = f.read()
+    data = read_record_txt(BytesIO(raw))
+    previous_attachments = {record.parquet_attachment_id, record.pyramid_attachment_id} - {None}
+    processed_steps = list(record.processed_steps)
+    for (step, generate) in RECORD_PROCESSING_STEPS.items():
+        if steps is None or step in steps:
+            generate(record, data, raw)
+            if step not in processed_steps:
+                processed_steps.append(step)
+    record.processed_steps = processed_steps
+    record.save()
+    # derived files replaced by a rebuild are only referenced by the record, their objects are left to gc_storage
+    StorageAttachment.objects.filter(
+        id__in=previous_attachments - {record.parquet_attachment_id, record.pyramid_attachment_id}
+    ).delete()
+    return record
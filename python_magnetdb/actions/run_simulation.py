@@ -9,6 +9,7 @@ from python_magnetsetup.config import appenv
 from python_magnetsetup.job import JobManager, JobManagerType
 from python_magnetsetup.node import NodeSpec, NodeType
 
+from python_magnetdb.actions.simulation_outputs import simulation_output_mode, store_simulation_outputs
 from python_magnetdb.models import StorageAttachment, Simulation
 from python_magnetsetup.setup import setup_cmds
 
@@ -92,11 +93,15 @@ def run_simulation(simulation: Simulation):
                     else:
                         run_cmd([f"bash -c \"{value}\""], log_file)
 
-                log_file.write("Archiving results...\n")
-                simulation_name = os.path.basename(os.path.splitext(simulation.setup_state['cfgfile'])[0])
-                output_archive = f"{tempdir}/{simulation_name}.tar.gz"
-                run_cmd([f"tar --exclude=tmp.hdf --exclude=setup.tar.gz -cvzf {output_archive} *"], log_file)
-                simulation.output_attachment = StorageAttachment.raw_upload(basename(output_archive), "application/x-tar", output_archive)
+                if simulation_output_mode == 'files':
+                    log_file.write("Storing results...\n")
+                    store_simulation_outputs(simulation, tempdir)
+                else:
+                    log_file.write("Archiving results...\n")
+                    simulation_name = os.path.basename(os.path.splitext(simulation.setup_state['cfgfile'])[0])
+                    output_archive = f"{tempdir}/{simulation_name}.tar.gz"
+                    run_cmd([f"tar --exclude=tmp.hdf --exclude=setup.tar.gz -cvzf {output_archive} *"], log_file)
+                    simulation.output_attachment = StorageAttachment.raw_upload(basename(output_archive), "application/x-tar", output_archive)
                 log_file.write("Done!\n")
                 simulation.status = "done"
             except Exception as err:
@@ -1,6 +1,7 @@
 from typing import TextIO
 from typing import Type
 
+from .simulation_outputs import simulation_output_mode, store_simulation_archive
 from ..models import StorageAttachment
 from ..models.server import Server
 from ..models.simulation import Simulation
@@ -127,7 +128,11 @@ def run_ssh_simulation(simulation: Simulation, server: Server, cores):
                     run_cmd(connection, f"tar --exclude=tmp.hdf --exclude=setup.tar.gz -czf {remote_output_archive} *", log_file)
                     local_output_archive = f"{local_tempdir}/{simulation_name}.tar.gz"
                     connection.get(remote_output_archive, local_output_archive)
-                    simulation.output_attachment = StorageAttachment.raw_upload(basename(local_output_archive), "application/x-tar", local_output_archive)
+                    if simulation_output_mode == 'files':
+                        log_file.write("Storing results...\n")
+                        store_simulation_archive(simulation, local_output_archive)
+                    else:
+                        simulation.output_attachment = StorageAttachment.raw_upload(basename(local_output_archive), "application/x-tar", local_output_archive)
 
                 log_file.write("Done!\n")
                 simulation.status = "done"
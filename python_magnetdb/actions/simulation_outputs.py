@@ -0,0 +1,114 @@
+import hashlib
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from os import getenv
+
+from django.db import transaction
+
+from python_magnetdb.models import Simulation, SimulationOutputFile, StorageAttachment
+from python_magnetdb.utils.staging import staging_workers
+from python_magnetdb.utils.storage_codec import chunk_size
+
+# 'archive' stores the results as a single tar.gz attachment, 'files' stores each file under its content hash
+simulation_output_mode = getenv('SIMULATION_OUTPUT_MODE') or 'archive'
+# left out of the results, like the archives always did
+excluded_output_files = ['tmp.hdf', 'setup.tar.gz']
+
+
+def _excluded(relative_path: str) -> bool:
+    return any(fnmatch(part, pattern) for part in relative_path.split('/') for pattern in excluded_output_files)
+
+
+def _hash_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def store_simulation_outputs(simulation: Simulation, directory: str, workers: int = staging_workers):
+    """store each file of directory under its content hash and replace the output manifest of the simulation
+
+    Files are hashed and the missing ones uploaded concurrently, the rows are only written once every object is
+    stored.
+    """
+    files = []
+    for (root, _, filenames) in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            relative_path = os.path.relpath(path, directory)
+            if not _excluded(relative_path) and not os.path.islink(path):
+                files.append((relative_path, path))
+    files.sort()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        keys = list(executor.map(lambda file: _hash_file(file[1]), files))
+        codecs = dict(StorageAttachment.objects.filter(key__in=keys).values_list('key', 'codec'))
+        missing = {}
+        for ((relative_path, path), key) in zip(files, keys):
+            if key not in codecs:
+                missing.setdefault(key, path)
+        list(executor.map(
+            lambda item: StorageAttachment.store_file(item[0], item[1], _content_type(item[1])), missing.items()
+        ))
+
+    with transaction.atomic():
+        previous = list(simulation.simulationoutputfile_set.values_list('attachment_id', flat=True))
+        StorageAttachment.objects.filter(id__in=previous).delete()
+        attachments = StorageAttachment.objects.bulk_create([
+            StorageAttachment(
+                filename=os.path.basename(relative_path), content_type=_content_type(path), key=key,
+                size=os.path.getsize(path), codec=codecs.get(key),
+            ) for ((relative_path, path), key) in zip(files, keys)
+        ])
+        SimulationOutputFile.objects.bulk_create([
+            SimulationOutputFile(simulation=simulation, path=relative_path, attachment=attachment, size=attachment.size)
+            for ((relative_path, _), attachment) in zip(files, attachments)
+        ])
+    print(f"stored {len(files)} output files of simulation {simulation.id}, {len(missing)} new objects")
+
+
+def store_simulation_archive(simulation: Simulation, archive_path: str):
+    """store the files of a results archive, see store_simulation_outputs"""
+    with tempfile.TemporaryDirectory() as tempdir:
+        with tarfile.open(archive_path) as archive:
+            archive.extractall(tempdir, filter='data')
+        store_simulation_outputs(simulation, tempdir)
+
+
+def _content_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _tar_stream(files):
+    """tar of the output files, generated as their objects are read"""
+    for file in files:
+        info = tarfile.TarInfo(file.path)
+        info.size = file.size
+        info.mode = 0o644
+        info.mtime = int(file.created_at.timestamp())
+        yield info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+        response = file.attachment.download()
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+        if file.size % tarfile.BLOCKSIZE != 0:
+            yield tarfile.NUL * (tarfile.BLOCKSIZE - file.size % tarfile.BLOCKSIZE)
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def export_simulation_outputs(simulation: Simulation):
+    """the output files as a tar.gz stream, the same archive the simulations used to store"""
+    files = simulation.simulationoutputfile_set.select_related('attachment').order_by('path')
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for data in _tar_stream(files):
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
@@ -0,0 +1,40 @@
+from traceback import print_exception
+
+from django.core.management.base import BaseCommand
+
+from python_magnetdb.actions.process_record import process_record, missing_steps_filter, RECORD_PROCESSING_STEPS
+from python_magnetdb.models import Record
+
+
+class Command(BaseCommand):
+    help = "Build the derived files of existing records"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', nargs='+', choices=list(RECORD_PROCESSING_STEPS.keys()),
+                            default=list(RECORD_PROCESSING_STEPS.keys()))
+        parser.add_argument('--site', type=str, default=None, help="only process the records of this site")
+        parser.add_argument('--ids', type=int, nargs='+', default=None, help="only process these records")
+        parser.add_argument('--force', action='store_true', help="rebuild steps that were already run")
+
+    def handle(self, *args, **options):
+        steps = options['steps']
+        db_query = Record.objects.prefetch_related('attachment').filter(live=False)
+        if options['site'] is not None:
+            db_query = db_query.filter(site__name=options['site'])
+        if options['ids'] is not None:
+            db_query = db_query.filter(id__in=options['ids'])
+        if not options['force']:
+            db_query = db_query.filter(missing_steps_filter(steps))
+
+        total = db_query.count()
+        failed = 0
+        for (index, record) in enumerate(db_query.order_by('id').iterator()):
+            self.stdout.write(f"[{index + 1}/{total}] {record.name}")
+            # without --force only the steps the record is missing are run, the others keep their files
+            missing = steps if options['force'] else [step for step in steps if step not in record.processed_steps]
+            try:
+                process_record(record, steps=missing)
+            except Exception as err:
+                failed += 1
+                print_exception(None, err, err.__traceback__)
+        self.stdout.write(f"{total - failed} records processed, {failed} failed")
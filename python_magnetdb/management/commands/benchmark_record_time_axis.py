@@ -0,0 +1,51 @@
+import timeit
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from python_magnetdb.utils.record_data import read_record_txt
+from python_magnetdb.utils.record_time_axis import add_time_axis, time_format
+
+
+def add_time_axis_rowwise(data: pd.DataFrame) -> pd.DataFrame:
+    """previous implementation of visualize, kept as the reference of this benchmark"""
+    t0 = datetime.strptime(data['Date'].iloc[0] + " " + data['Time'].iloc[0], time_format)
+    data["t"] = data.apply(
+        lambda row: (datetime.strptime(row.Date + " " + row.Time, time_format) - t0).total_seconds(),
+        axis=1
+    )
+    data["timestamp"] = data.apply(lambda row: datetime.strptime(row.Date + " " + row.Time, time_format), axis=1)
+    return data
+
+
+def generate_record(rows: int) -> pd.DataFrame:
+    start = datetime(2019, 6, 18, 23, 10, 31)
+    timestamps = [start + timedelta(seconds=index) for index in range(rows)]
+    return pd.DataFrame({
+        'Date': [timestamp.strftime("%Y.%m.%d") for timestamp in timestamps],
+        'Time': [timestamp.strftime("%H:%M:%S") for timestamp in timestamps],
+        'Field': [index * 1e-4 for index in range(rows)],
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized record time-axis construction with the former row-wise one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="rows of the generated record")
+        parser.add_argument('--file', type=str, default=None, help="use an acquisition file instead")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['file'] is not None:
+            data = read_record_txt(options['file'])[['Date', 'Time']]
+        else:
+            data = generate_record(options['rows'])
+        self.stdout.write(f"{len(data)} rows, best of {options['repeat']}")
+
+        timings = {}
+        for (name, func) in [('row-wise', add_time_axis_rowwise), ('vectorized', add_time_axis)]:
+            timings[name] = min(timeit.repeat(lambda: func(data.copy()), number=1, repeat=options['repeat']))
+            self.stdout.write(f"{name:>12}: {timings[name] * 1000:10.1f} ms")
+        self.stdout.write(f"     speedup: {timings['row-wise'] / timings['vectorized']:10.1f}x")
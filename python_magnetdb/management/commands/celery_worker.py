@@ -5,7 +5,7 @@ from watchfiles import run_process
 
 def run_celery():
     celery_cmd = shutil.which('celery')
-    cmd = [celery_cmd, '-A', 'python_magnetdb.worker', 'worker', '--loglevel=info']
+    cmd = [celery_cmd, '-A', 'python_magnetdb.worker', 'worker', '-B', '--loglevel=info']
     subprocess.run(cmd)
 
 class Command(BaseCommand):
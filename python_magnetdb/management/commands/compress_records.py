@@ -0,0 +1,46 @@
+import os
+import tempfile
+from traceback import print_exception
+
+from django.core.management.base import BaseCommand
+
+from python_magnetdb.models import Record, StorageAttachment
+from python_magnetdb.storage import get_storage
+from python_magnetdb.utils.storage_codec import StorageCodec
+
+
+class Command(BaseCommand):
+    help = "Store the raw files of existing records compressed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codec', type=StorageCodec, choices=list(StorageCodec), default=StorageCodec.GZIP)
+        parser.add_argument('--site', type=str, default=None, help="only compress the records of this site")
+
+    def handle(self, *args, **options):
+        codec = options['codec']
+        db_query = Record.objects.filter(live=False, attachment__codec__isnull=True)
+        if options['site'] is not None:
+            db_query = db_query.filter(site__name=options['site'])
+        keys = list(db_query.values_list('attachment__key', flat=True).distinct())
+
+        (original_bytes, compressed_bytes, failed) = (0, 0, 0)
+        for (index, key) in enumerate(keys):
+            self.stdout.write(f"[{index + 1}/{len(keys)}] {key}")
+            try:
+                with tempfile.TemporaryDirectory() as tempdir:
+                    attachment = StorageAttachment.objects.filter(key=key, codec__isnull=True).first()
+                    if attachment is None:
+                        continue
+                    file_path = os.path.join(tempdir, 'original')
+                    attachment.download(file_path)
+                    StorageAttachment.store_file(key, file_path, attachment.content_type, codec)
+                    # rows are switched to the compressed object before the original one is removed
+                    StorageAttachment.objects.filter(key=key).update(codec=codec.value)
+                    get_storage().remove(key)
+                    original_bytes += os.path.getsize(file_path)
+                    compressed_bytes += get_storage().size(StorageAttachment.object_name(key, codec))
+            except Exception as err:
+                failed += 1
+                print_exception(None, err, err.__traceback__)
+        self.stdout.write(f"{len(keys) - failed} files compressed, {failed} failed, "
+                          f"{original_bytes} bytes stored in {compressed_bytes}")
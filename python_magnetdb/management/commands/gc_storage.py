@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from python_magnetdb.actions.gc_storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Remove the stored objects no attachment refers to anymore"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="only report what would be removed")
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="keep objects and rows created more recently than this")
+        parser.add_argument('--batch-size', type=int, default=1000, help="objects removed per request")
+        parser.add_argument('--orphan-rows', action='store_true',
+                            help="also delete the attachment rows no model points to, then their objects")
+
+    def handle(self, *args, **options):
+        report = collect_garbage(
+            dry_run=options['dry_run'],
+            grace=timedelta(hours=options['grace_hours']),
+            batch_size=options['batch_size'],
+            orphan_rows=options['orphan_rows'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(
+            f"{'would reclaim' if options['dry_run'] else 'reclaimed'} {report['bytes']} bytes "
+            f"from {report['objects']} objects, {report['orphan_rows']} orphan rows, {report['failed']} failures"
+        )
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import path
+from traceback import print_exception
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from python_magnetdb.actions.process_record import process_record
+from python_magnetdb.models import Record, Site, StorageAttachment
+from python_magnetdb.utils.record_data import extract_date_from_filename, record_storage_codec
+
+
+def hash_file(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class Command(BaseCommand):
+    help = "Import a directory of acquisition files as records of a site"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=str)
+        parser.add_argument('--site', type=str, required=True, help="name of the site the records belong to")
+        parser.add_argument('--pattern', type=str, default='**/*.txt', help="glob of the files to import")
+        parser.add_argument('--workers', type=int, default=8, help="threads used to hash, upload and process")
+        parser.add_argument('--batch-size', type=int, default=500, help="rows inserted per query")
+        parser.add_argument('--skip-processing', action='store_true',
+                            help="do not build the derived files (see backfill_records)")
+
+    def _run(self, workers: int, func, items: list, label: str):
+        def run(item):
+            try:
+                return func(item)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, items))
+        self.stdout.write(f"{label}: {len(items)} files in {time.perf_counter() - start:.1f}s")
+        return results
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(name=options['site']).first()
+        if site is None:
+            raise CommandError(f"Site {options['site']} not found")
+
+        files = sorted(glob.glob(path.join(options['directory'], options['pattern']), recursive=True))
+        files = [file for file in files if path.isfile(file)]
+        self.stdout.write(f"{len(files)} files found")
+        if len(files) == 0:
+            return
+
+        keys = dict(zip(files, self._run(options['workers'], hash_file, files, "hashed")))
+
+        # files already imported on this site are skipped, blobs already stored are not uploaded again
+        imported = set(Record.objects.filter(site=site, attachment__key__in=keys.values())
+                       .values_list('attachment__key', flat=True))
+        files = [file for file in files if keys[file] not in imported]
+        # rows sharing a key share the stored object and therefore its codec
+        stored = dict(StorageAttachment.objects.filter(key__in=keys.values()).values_list('key', 'codec'))
+        uploads = list({keys[file]: file for file in files if keys[file] not in stored}.values())
+        self.stdout.write(f"{len(imported)} files already imported, {len(uploads)} blobs to upload")
+        self._run(options['workers'],
+                  lambda file: StorageAttachment.store_file(keys[file], file, 'text/tsv', record_storage_codec),
+                  uploads, "uploaded")
+        codec = record_storage_codec.value if record_storage_codec is not None else None
+
+        with transaction.atomic():
+            attachments = StorageAttachment.objects.bulk_create([
+                StorageAttachment(filename=path.basename(file), content_type='text/tsv', key=keys[file],
+                              size=path.getsize(file), codec=stored.get(keys[file], codec))
+                for file in files
+            ], batch_size=options['batch_size'])
+            records = Record.objects.bulk_create([
+                Record(name=path.basename(file), site=site, attachment=attachment)
+                for (file, attachment) in zip(files, attachments)
+            ], batch_size=options['batch_size'])
+            # created_at is auto_now_add, bulk_update is the only way to store the acquisition date
+            for (file, record) in zip(files, records):
+                record.created_at = timezone.make_aware(extract_date_from_filename(path.basename(file)) or datetime.now())
+            Record.objects.bulk_update(records, ['created_at'], batch_size=options['batch_size'])
+        self.stdout.write(f"{len(records)} records created")
+
+        if options['skip_processing']:
+            return
+
+        def process(item):
+            (record, file) = item
+            try:
+                process_record(record, file)
+                return True
+            except Exception as err:
+                print_exception(None, err, err.__traceback__)
+                return False
+
+        processed = self._run(options['workers'], process, list(zip(records, files)), "processed")
+        self.stdout.write(f"{processed.count(False)} records failed to process")
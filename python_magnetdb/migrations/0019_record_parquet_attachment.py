@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0018_simulation_mesh_attachment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='parquet_attachment',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='record_parquet_attachment', to='python_magnetdb.storageattachment'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0019_record_parquet_attachment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='pyramid_attachment',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='record_pyramid_attachment', to='python_magnetdb.storageattachment'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0020_record_pyramid_attachment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordColumnStatistics',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('column', models.CharField(max_length=255)),
+                ('min', models.FloatField(null=True)),
+                ('max', models.FloatField(null=True)),
+                ('mean', models.FloatField(null=True)),
+                ('std', models.FloatField(null=True)),
+                ('duration', models.FloatField(null=True)),
+                ('first_timestamp', models.DateTimeField(null=True)),
+                ('last_timestamp', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.record')),
+            ],
+            options={
+                'db_table': 'record_column_statistics',
+                'indexes': [models.Index(fields=['column', 'max'], name='record_column_stats_max_idx'), models.Index(fields=['column', 'min'], name='record_column_stats_min_idx')],
+                'constraints': [models.UniqueConstraint(fields=('record', 'column'), name='record_column_statistics_record_column_unique')],
+            },
+        ),
+    ]
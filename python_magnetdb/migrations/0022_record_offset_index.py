@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0021_recordcolumnstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='offset_index',
+            field=models.JSONField(null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+def create_default_channels(apps, schema_editor):
+    DerivedChannel = apps.get_model('python_magnetdb', 'DerivedChannel')
+    DerivedChannel.objects.bulk_create([
+        DerivedChannel(name='Rcoil{i}', expression='Ucoil{i} / Icoil{i}', unit='Ohm',
+                       description='resistance of coil {i}'),
+        DerivedChannel(name='Pcoil{i}', expression='Ucoil{i} * Icoil{i} / 1e6', unit='MW',
+                       description='power dissipated in coil {i}'),
+        DerivedChannel(name='Idcct', expression='Idcct1 + Idcct2 + Idcct3 + Idcct4', unit='A',
+                       description='sum of the Idcct currents'),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0022_record_offset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivedChannel',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('expression', models.TextField()),
+                ('unit', models.CharField(max_length=255, null=True)),
+                ('description', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'derived_channels',
+            },
+        ),
+        migrations.RunPython(create_default_channels, migrations.RunPython.noop),
+    ]
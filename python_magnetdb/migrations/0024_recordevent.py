@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0023_derivedchannel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('ramp_up', 'RAMP_UP'), ('ramp_down', 'RAMP_DOWN'), ('plateau', 'PLATEAU'), ('trip', 'TRIP')], max_length=255)),
+                ('column', models.CharField(max_length=255)),
+                ('t_start', models.FloatField()),
+                ('t_end', models.FloatField()),
+                ('start_value', models.FloatField()),
+                ('end_value', models.FloatField()),
+                ('mean_value', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.record')),
+            ],
+            options={
+                'db_table': 'record_events',
+                'indexes': [models.Index(fields=['record', 'type'], name='record_events_record_type_idx'), models.Index(fields=['type', 'column'], name='record_events_type_column_idx')],
+            },
+        ),
+    ]
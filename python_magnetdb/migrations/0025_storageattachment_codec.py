@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0024_recordevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storageattachment',
+            name='codec',
+            field=models.CharField(choices=[('gzip', 'GZIP')], max_length=255, null=True),
+        ),
+    ]
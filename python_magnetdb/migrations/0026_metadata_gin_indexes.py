@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 16:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0025_storageattachment_codec'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='magnet',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='magnets_metadata_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='materials_metadata_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='parts_metadata_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='records_metadata_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='simulation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='simulations_metadata_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='site',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='sites_metadata_gin'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 16:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0026_metadata_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='live',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='record',
+            name='attachment',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.storageattachment'),
+        ),
+        migrations.CreateModel(
+            name='RecordChunk',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('sequence', models.BigIntegerField()),
+                ('columns', models.JSONField()),
+                ('rows', models.BigIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('first_t', models.FloatField()),
+                ('last_t', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attachment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.storageattachment')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.record')),
+            ],
+            options={
+                'db_table': 'record_chunks',
+                'constraints': [models.UniqueConstraint(fields=('record', 'sequence'), name='record_chunks_record_sequence_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0027_record_live_recordchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storageattachment',
+            name='size',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0028_storageattachment_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulationOutputFile',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('path', models.CharField(max_length=1024)),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attachment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.storageattachment')),
+                ('simulation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='python_magnetdb.simulation')),
+            ],
+            options={
+                'db_table': 'simulation_output_files',
+                'constraints': [models.UniqueConstraint(fields=('simulation', 'path'), name='simulation_output_files_simulation_path_unique')],
+            },
+        ),
+    ]
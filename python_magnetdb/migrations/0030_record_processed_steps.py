@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_processed_steps(apps, schema_editor):
+    """steps whose result is already stored, the others are left to backfill_records"""
+    Record = apps.get_model('python_magnetdb', 'Record')
+    conditions = {
+        'parquet': Q(parquet_attachment__isnull=False),
+        'pyramid': Q(pyramid_attachment__isnull=False),
+        'statistics': Q(recordcolumnstatistics__isnull=False),
+        'offset_index': Q(offset_index__isnull=False),
+        'events': Q(recordevent__isnull=False),
+    }
+    processed = {}
+    for (step, condition) in conditions.items():
+        for record_id in Record.objects.filter(condition).values_list('id', flat=True).distinct():
+            processed.setdefault(record_id, []).append(step)
+    records = list(Record.objects.filter(id__in=processed.keys()).only('id'))
+    for record in records:
+        record.processed_steps = processed[record.id]
+    Record.objects.bulk_update(records, ['processed_steps'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0029_simulationoutputfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='processed_steps',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(mark_processed_steps, migrations.RunPython.noop),
+    ]
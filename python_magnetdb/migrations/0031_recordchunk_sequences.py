@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+def fill_sequences(apps, schema_editor):
+    """chunks merged before sequences existed only keep the sequence of their last chunk"""
+    RecordChunk = apps.get_model('python_magnetdb', 'RecordChunk')
+    chunks = list(RecordChunk.objects.only('id', 'sequence'))
+    for chunk in chunks:
+        chunk.sequences = [chunk.sequence]
+    RecordChunk.objects.bulk_update(chunks, ['sequences'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('python_magnetdb', '0030_record_processed_steps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordchunk',
+            name='sequences',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(fill_sequences, migrations.RunPython.noop),
+    ]
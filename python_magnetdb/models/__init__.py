@@ -13,3 +13,8 @@ from .user import User
 from .magnet import Magnet
 from .part import Part
 from .mesh_attachment import MeshAttachment
+from .record_column_statistics import RecordColumnStatistics
+from .derived_channel import DerivedChannel
+from .record_event import RecordEvent, RecordEventType
+from .record_chunk import RecordChunk
+from .simulation_output_file import SimulationOutputFile
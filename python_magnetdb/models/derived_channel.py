@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class DerivedChannel(models.Model):
+    class Meta:
+        db_table = 'derived_channels'
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True, null=False)
+    expression = models.TextField(null=False)
+    unit = models.CharField(max_length=255, null=True)
+    description = models.TextField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
@@ -1,6 +1,7 @@
 import enum
 import json
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 from python_magnetdb.models.part import PartType
@@ -30,6 +31,9 @@ class MagnetType(str, enum.Enum):
 class Magnet(models.Model):
     class Meta:
         db_table = 'magnets'
+        indexes = [
+            GinIndex(fields=['metadata'], name='magnets_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     type = models.CharField(max_length=255, null=False, choices=MagnetType.choices())
     name = models.CharField(max_length=255, unique=True, null=False)
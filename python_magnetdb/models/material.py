@@ -1,9 +1,13 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
 class Material(models.Model):
     class Meta:
         db_table = 'materials'
+        indexes = [
+            GinIndex(fields=['metadata'], name='materials_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255, unique=True, null=False)
     nuance = models.CharField(max_length=255, null=True)
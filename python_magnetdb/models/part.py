@@ -2,6 +2,7 @@ import copy
 import enum
 import json
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 from python_magnetdb.utils.yaml_json import json_to_yaml
@@ -23,6 +24,9 @@ class PartType(str, enum.Enum):
 class Part(models.Model):
     class Meta:
         db_table = 'parts'
+        indexes = [
+            GinIndex(fields=['metadata'], name='parts_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255, unique=True, null=False)
     description = models.TextField(null=True)
@@ -1,14 +1,48 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Q
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 
 
 class Record(models.Model):
     class Meta:
         db_table = 'records'
+        indexes = [
+            GinIndex(fields=['metadata'], name='records_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255, null=False)
     description = models.TextField(null=True)
     site = models.ForeignKey('Site', on_delete=models.CASCADE, null=False)
-    attachment = models.ForeignKey('StorageAttachment', on_delete=models.CASCADE, null=False)
+    # null while the record is live, its rows are then held by record chunks until it is finalized
+    attachment = models.ForeignKey('StorageAttachment', on_delete=models.CASCADE, null=True)
+    parquet_attachment = models.ForeignKey('StorageAttachment', on_delete=models.SET_NULL, null=True, related_name='record_parquet_attachment')
+    pyramid_attachment = models.ForeignKey('StorageAttachment', on_delete=models.SET_NULL, null=True, related_name='record_pyramid_attachment')
     metadata = models.JSONField(default=dict, null=False)
+    offset_index = models.JSONField(null=True)
+    # names of the processing steps run on the record, a step may produce nothing (no events, no pyramid)
+    processed_steps = models.JSONField(default=list, null=False)
+    live = models.BooleanField(default=False, null=False)
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
+
+
+@receiver(pre_delete, sender=Record)
+def delete_derived_attachments(sender, instance, **kwargs):
+    from python_magnetdb.models import StorageAttachment
+
+    # derived files are only referenced by the record, the chunks of a live record go with their attachments
+    StorageAttachment.objects.filter(
+        Q(id__in=[instance.parquet_attachment_id, instance.pyramid_attachment_id])
+        | Q(id__in=instance.recordchunk_set.values('attachment_id'))
+    ).delete()
+
+
+@receiver(post_delete, sender=Record)
+def delete_attachment(sender, instance, **kwargs):
+    from python_magnetdb.models import StorageAttachment
+
+    # deleting the raw file cascades to the record, it is only removed once the record is gone
+    if instance.attachment_id is not None:
+        StorageAttachment.objects.filter(id=instance.attachment_id).delete()
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class RecordChunk(models.Model):
+    class Meta:
+        db_table = 'record_chunks'
+        constraints = [
+            models.UniqueConstraint(fields=['record', 'sequence'], name='record_chunks_record_sequence_unique'),
+        ]
+    id = models.BigAutoField(primary_key=True)
+    record = models.ForeignKey('Record', on_delete=models.CASCADE, null=False)
+    # sequence number of the last appended chunk merged into this one
+    sequence = models.BigIntegerField(null=False)
+    # sequence numbers of the appended chunks merged into this one
+    sequences = models.JSONField(default=list, null=False)
+    attachment = models.ForeignKey('StorageAttachment', on_delete=models.CASCADE, null=False)
+    columns = models.JSONField(null=False)
+    rows = models.BigIntegerField(null=False)
+    first_timestamp = models.DateTimeField(null=False)
+    first_t = models.FloatField(null=False)
+    last_t = models.FloatField(null=False)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
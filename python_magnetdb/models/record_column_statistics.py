@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class RecordColumnStatistics(models.Model):
+    class Meta:
+        db_table = 'record_column_statistics'
+        constraints = [
+            models.UniqueConstraint(fields=['record', 'column'], name='record_column_statistics_record_column_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['column', 'max'], name='record_column_stats_max_idx'),
+            models.Index(fields=['column', 'min'], name='record_column_stats_min_idx'),
+        ]
+    id = models.BigAutoField(primary_key=True)
+    record = models.ForeignKey('Record', on_delete=models.CASCADE, null=False)
+    column = models.CharField(max_length=255, null=False)
+    min = models.FloatField(null=True)
+    max = models.FloatField(null=True)
+    mean = models.FloatField(null=True)
+    std = models.FloatField(null=True)
+    duration = models.FloatField(null=True)
+    first_timestamp = models.DateTimeField(null=True)
+    last_timestamp = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
@@ -0,0 +1,34 @@
+import enum
+
+from django.db import models
+
+
+class RecordEventType(str, enum.Enum):
+    RAMP_UP = 'ramp_up'
+    RAMP_DOWN = 'ramp_down'
+    PLATEAU = 'plateau'
+    TRIP = 'trip'
+
+    @classmethod
+    def choices(cls):
+        return [(item.value, item.name) for item in cls]
+
+
+class RecordEvent(models.Model):
+    class Meta:
+        db_table = 'record_events'
+        indexes = [
+            models.Index(fields=['record', 'type'], name='record_events_record_type_idx'),
+            models.Index(fields=['type', 'column'], name='record_events_type_column_idx'),
+        ]
+    id = models.BigAutoField(primary_key=True)
+    record = models.ForeignKey('Record', on_delete=models.CASCADE, null=False)
+    type = models.CharField(max_length=255, null=False, choices=RecordEventType.choices())
+    column = models.CharField(max_length=255, null=False)
+    t_start = models.FloatField(null=False)
+    t_end = models.FloatField(null=False)
+    start_value = models.FloatField(null=False)
+    end_value = models.FloatField(null=False)
+    mean_value = models.FloatField(null=False)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
@@ -6,6 +7,9 @@ from django.dispatch import receiver
 class Simulation(models.Model):
     class Meta:
         db_table = 'simulations'
+        indexes = [
+            GinIndex(fields=['metadata'], name='simulations_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     status = models.TextField(default='pending', null=True)
     magnet = models.ForeignKey('Magnet', on_delete=models.CASCADE, null=True)
@@ -68,3 +72,8 @@ def delete_attachments(sender, instance, **kwargs):
             attachment = StorageAttachment.objects.filter(id=attachment_id).first()
             if attachment:
                 attachment.delete()
+
+    # the rows of the output files go with the simulation, their attachments do not
+    StorageAttachment.objects.filter(
+        id__in=instance.simulationoutputfile_set.values('attachment_id')
+    ).delete()
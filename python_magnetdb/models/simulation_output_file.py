@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class SimulationOutputFile(models.Model):
+    """file of the results of a simulation, stored under its content hash so files left unchanged by reruns and
+    sweeps share their object"""
+    class Meta:
+        db_table = 'simulation_output_files'
+        constraints = [
+            models.UniqueConstraint(fields=['simulation', 'path'], name='simulation_output_files_simulation_path_unique'),
+        ]
+    id = models.BigAutoField(primary_key=True)
+    simulation = models.ForeignKey('Simulation', on_delete=models.CASCADE, null=False)
+    # relative to the working directory of the simulation
+    path = models.CharField(max_length=1024, null=False)
+    attachment = models.ForeignKey('StorageAttachment', on_delete=models.CASCADE, null=False)
+    size = models.BigIntegerField(null=False)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
@@ -1,5 +1,6 @@
 import json
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 from python_magnetdb.utils.yaml_json import json_to_yaml
@@ -8,6 +9,9 @@ from python_magnetdb.utils.yaml_json import json_to_yaml
 class Site(models.Model):
     class Meta:
         db_table = 'sites'
+        indexes = [
+            GinIndex(fields=['metadata'], name='sites_metadata_gin'),
+        ]
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255, unique=True, null=False)
     description = models.TextField(null=True)
@@ -1,11 +1,23 @@
 import hashlib
+import os
 import shutil
 import tempfile
+import time
+import uuid
+from datetime import timedelta
 
 from django.db import models
 from fastapi import UploadFile
 
-from python_magnetdb.storage import s3_client, s3_bucket
+from python_magnetdb.storage import get_storage, presigned_expiry
+from python_magnetdb.utils.storage_cache import storage_cache
+from python_magnetdb.utils.storage_codec import StorageCodec, compress_file, decompress, chunk_size
+from python_magnetdb.utils.storage_stream import HashingReader
+
+# uploads are streamed there until their hash, hence their key, is known
+staging_prefix = 'staging/'
+# copies of client uploads no presigned url points to
+private_staging_prefix = 'staging/private/'
 
 
 class StorageAttachment(models.Model):
@@ -15,28 +27,171 @@ class StorageAttachment(models.Model):
     filename = models.CharField(max_length=255, null=True)
     content_type = models.CharField(max_length=255, null=True)
     key = models.CharField(max_length=255, null=False)
+    # size of the original bytes
+    size = models.BigIntegerField(null=True)
+    # rows sharing a key share the stored object, hence its codec
+    codec = models.CharField(max_length=255, null=True, choices=StorageCodec.choices())
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
+    @staticmethod
+    def object_name(key: str, codec=None):
+        """name of the stored object, compressed objects get a suffix so both forms can coexist while converting"""
+        return key if codec is None else f"{key}.{StorageCodec(codec).value}"
+
     def download(self, path=None):
-        if path is not None:
-            return s3_client.fget_object(s3_bucket, self.key, path)
-        return s3_client.get_object(s3_bucket, self.key)
+        """original bytes of the attachment, decompressed on the fly when stored with a codec
+
+        Files downloaded to a path go through the local disk cache when STORAGE_CACHE_DIR is set.
+        """
+        if path is not None and storage_cache is not None:
+            return storage_cache.fetch(self.key, self._download_object, path)
+        return self._download_object(path)
+
+    def _download_object(self, path=None):
+        object_name = self.object_name(self.key, self.codec)
+        if self.codec is None:
+            if path is not None:
+                return get_storage().get_file(object_name, path)
+            return get_storage().get(object_name)
+
+        stream = decompress(self.codec, get_storage().get(object_name))
+        if path is None:
+            return stream
+        with stream, open(path, 'wb') as f:
+            shutil.copyfileobj(stream, f)
+
+    def content_size(self):
+        """size of the original bytes, None when unknown (compressed attachments stored before sizes were kept)"""
+        if self.size is None and self.codec is None:
+            self.size = get_storage().size(self.key)
+            self.save(update_fields=['size'])
+        return self.size
+
+    def download_range(self, offset: int, length: int):
+        if self.codec is not None:
+            raise ValueError("Ranges of compressed attachments cannot be downloaded")
+        return get_storage().get(self.key, offset=offset, length=length)
+
+    @classmethod
+    def upload(cls, file: UploadFile, codec: StorageCodec = None):
+        return cls.upload_stream(file.file, file.filename, file.content_type, codec)
 
     @classmethod
-    def upload(cls, file: UploadFile):
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file.seek(0)
-            return cls.raw_upload(file.filename, file.content_type, temp_file.name)
+    def upload_stream(cls, stream, filename: str, content_type: str, codec: StorageCodec = None):
+        """store a stream in a single pass, hashing it while it is written to a staging object
+
+        Once the hash is known the staging object is copied under the key, or just dropped when the content is
+        already stored. The throughput achieved is left in upload_stats.
+        """
+        staging_name = f"{staging_prefix}{uuid.uuid4()}"
+        reader = HashingReader(stream, codec)
+        started_at = time.perf_counter()
+        try:
+            get_storage().put(staging_name, reader, content_type)
+            attachment = cls(filename=filename, content_type=content_type, key=reader.key, size=reader.size)
+            deduplicated = cls._store_staging(attachment, staging_name, codec)
+            attachment.save()
+        finally:
+            get_storage().remove(staging_name)
+
+        seconds = time.perf_counter() - started_at
+        attachment.upload_stats = {
+            'bytes': reader.size,
+            'stored_bytes': reader.stored_size,
+            'deduplicated': deduplicated,
+            'seconds': seconds,
+            'bytes_per_second': reader.size / seconds if seconds > 0 else None,
+        }
+        return attachment
 
     @classmethod
-    def raw_upload(cls, filename: str, content_type: str, filepath: str):
-        attachment = cls(filename=filename,content_type=content_type)
+    def _store_staging(cls, attachment, staging_name: str, codec: StorageCodec = None) -> bool:
+        """copy a staging object under the key of attachment unless already stored, True when deduplicated"""
+        existing = cls.objects.filter(key=attachment.key).first()
+        if existing is not None:
+            attachment.codec = existing.codec
+            return True
+        get_storage().copy(staging_name, cls.object_name(attachment.key, codec))
+        attachment.codec = codec.value if codec is not None else None
+        return False
+
+    def presigned_download_url(self) -> str:
+        return get_storage().presigned_get_url(
+            self.object_name(self.key, self.codec), expires=timedelta(seconds=presigned_expiry),
+            response_headers={
+                'response-content-type': self.content_type or 'application/octet-stream',
+                'response-content-disposition': f'attachment; filename="{self.filename}"',
+            },
+        )
+
+    @classmethod
+    def presigned_upload(cls):
+        """(upload id, url) of a staging object a client can PUT a file to, see finalize_upload"""
+        upload_id = str(uuid.uuid4())
+        url = get_storage().presigned_put_url(
+            f"{staging_prefix}{upload_id}", expires=timedelta(seconds=presigned_expiry)
+        )
+        return upload_id, url
+
+    @classmethod
+    def finalize_upload(cls, upload_id: str, filename: str, content_type: str, expected_key: str = None):
+        """hash a staging object uploaded through a presigned url, then store it like any upload
+
+        The hash is computed from the stored bytes, a client cannot name the content it did not upload: the presigned
+        url stays valid until it expires, so the object is first copied to a name no url was issued for, and that
+        copy is hashed and stored.
+        """
+        staging_name = f"{staging_prefix}{uuid.UUID(upload_id)}"
+        private_name = f"{private_staging_prefix}{uuid.uuid4()}"
+        try:
+            get_storage().copy(staging_name, private_name)
+        finally:
+            get_storage().remove(staging_name)
+        try:
+            response = get_storage().get(private_name)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                for chunk in response.stream(chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+            finally:
+                response.close()
+                response.release_conn()
+
+            attachment = cls(filename=filename, content_type=content_type, key=digest.hexdigest(), size=size)
+            if expected_key is not None and expected_key != attachment.key:
+                raise ValueError(f"Content hash mismatch: {attachment.key}")
+            cls._store_staging(attachment, private_name)
+            attachment.save()
+            return attachment
+        finally:
+            get_storage().remove(private_name)
+
+    @classmethod
+    def raw_upload(cls, filename: str, content_type: str, filepath: str, codec: StorageCodec = None):
+        attachment = cls(filename=filename,content_type=content_type, size=os.path.getsize(filepath))
         with open(filepath, 'rb') as f:
             attachment.key = hashlib.file_digest(f, 'sha256').hexdigest()
         print(attachment.key)
-        if cls.objects.filter(key=attachment.key).count() == 0:
-            s3_client.fput_object(s3_bucket, attachment.key, filepath, content_type=attachment.content_type)
+        existing = cls.objects.filter(key=attachment.key).first()
+        if existing is None:
+            cls.store_file(attachment.key, filepath, attachment.content_type, codec)
+            attachment.codec = codec.value if codec is not None else None
+        else:
+            attachment.codec = existing.codec
         attachment.save()
         return attachment
+
+    @classmethod
+    def store_file(cls, key: str, filepath: str, content_type: str, codec: StorageCodec = None):
+        """upload a file under its content hash without creating any row, key being the hash of the original
+        bytes"""
+        if codec is None:
+            get_storage().put_file(key, filepath, content_type)
+            return
+        with tempfile.TemporaryDirectory() as tempdir:
+            compressed_path = os.path.join(tempdir, 'compressed')
+            compress_file(codec, filepath, compressed_path)
+            get_storage().put_file(cls.object_name(key, codec), compressed_path, content_type)
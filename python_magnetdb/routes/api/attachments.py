@@ -1,23 +1,135 @@
+import re
+import tempfile
+from typing import Optional
+
 from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import StreamingResponse
+from django.db import connection, transaction
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Request, Response
+from fastapi.responses import StreamingResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
+from .serializers import model_serializer
 from ...dependencies import get_user
 from ...models import AuditLog
 from ...models.storage_attachment import StorageAttachment
+from ...storage import get_storage, presigned_expiry
+from ...utils.batch_upload import BatchUploadParser
+from ...utils.async_stream import stream_object
 
 router = APIRouter()
 
+range_pattern = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(value: str, size: int):
+    """(start, end) of a single byte range, end included; None to serve the whole content, ValueError when the
+    range cannot be satisfied"""
+    match = range_pattern.match(value.strip())
+    if match is None:
+        # multiple or malformed ranges are served as a full response
+        return None
+    (start, end) = match.groups()
+    if start == '' and end == '':
+        return None
+    if start == '':
+        length = int(end)
+        if length == 0:
+            raise ValueError()
+        return max(0, size - length), size - 1
+    start = int(start)
+    if end != '' and int(end) < start:
+        # syntactically invalid (RFC 7233), the header is ignored
+        return None
+    end = min(int(end), size - 1) if end != '' else size - 1
+    if start >= size:
+        raise ValueError()
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
 
 @router.get("/api/attachments/{id}/download")
-def download(id: int, user=Depends(get_user('read'))):
-    attachment = StorageAttachment.objects.filter(id=id).get()
+def download(id: int, user=Depends(get_user('read')), range: Optional[str] = Header(None),
+             if_range: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
+    attachment = StorageAttachment.objects.filter(id=id).first()
     if not attachment:
         raise HTTPException(status_code=404, detail="Attachment not found")
 
-    return StreamingResponse(attachment.download(), media_type=attachment.content_type, headers={
-        'content-disposition': f'attachment; filename="{attachment.filename}"'
-    })
+    # the key is the hash of the content, hence a strong validator
+    etag = f'"{attachment.key}"'
+    headers = {
+        'etag': etag,
+        'cache-control': 'private, no-cache',
+        'content-disposition': f'attachment; filename="{attachment.filename}"',
+    }
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # the client fetches the bytes itself, ranges included, compressed objects still go through the api
+    if get_storage().supports_presigned and attachment.codec is None:
+        return RedirectResponse(attachment.presigned_download_url(), status_code=307, headers=headers)
+
+    size = attachment.content_size()
+    # compressed objects cannot be read from an offset of their original bytes
+    ranges_supported = attachment.codec is None and size is not None
+    headers['accept-ranges'] = 'bytes' if ranges_supported else 'none'
+    if ranges_supported and range is not None and (if_range is None or if_range == etag):
+        try:
+            byte_range = _parse_range(range, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, 'content-range': f'bytes */{size}'})
+        if byte_range is not None:
+            (start, end) = byte_range
+            headers['content-range'] = f'bytes {start}-{end}/{size}'
+            headers['content-length'] = str(end - start + 1)
+            return StreamingResponse(stream_object(attachment.download_range(start, end - start + 1)), status_code=206,
+                                     media_type=attachment.content_type, headers=headers)
+
+    if size is not None:
+        headers['content-length'] = str(size)
+    return StreamingResponse(stream_object(attachment.download()), media_type=attachment.content_type, headers=headers)
+
+
+@router.get("/api/attachments/{id}/url")
+def download_url(id: int, user=Depends(get_user('read'))):
+    attachment = StorageAttachment.objects.filter(id=id).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if not get_storage().supports_presigned or attachment.codec is not None:
+        raise HTTPException(status_code=422, detail="Attachment cannot be downloaded directly")
+    return {'url': attachment.presigned_download_url(), 'expires_in': presigned_expiry}
+
+
+class FinalizeUploadPayload(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    sha256: Optional[str] = None
+
+
+@router.post("/api/attachments/uploads")
+def create_upload(user=Depends(get_user('create'))):
+    if not get_storage().supports_presigned:
+        raise HTTPException(status_code=422, detail="Direct uploads are not enabled")
+    (upload_id, url) = StorageAttachment.presigned_upload()
+    return {'upload_id': upload_id, 'url': url, 'expires_in': presigned_expiry}
+
+
+@router.post("/api/attachments/uploads/{upload_id}/finalize")
+def finalize_upload(upload_id: str, payload: FinalizeUploadPayload, user=Depends(get_user('create'))):
+    if not get_storage().supports_presigned:
+        raise HTTPException(status_code=422, detail="Direct uploads are not enabled")
+    try:
+        attached = StorageAttachment.finalize_upload(upload_id, payload.filename, payload.content_type, payload.sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    AuditLog.log(user, f"Attachment created {payload.filename}", resource=attached)
+    return model_serializer(attached)
+
 
 class FilePayload(BaseModel):
     filename: str
@@ -27,6 +139,64 @@ class FilePayload(BaseModel):
 @router.post("/api/attachments")
 def upload(file: UploadFile = File(...), user=Depends(get_user('create'))):
     attached = StorageAttachment.upload(file)
-    attached.save()
     AuditLog.log(user, f"Attachment created {file.filename}", resource=attached)
-    return attached.serialize()
+    return {**model_serializer(attached), 'upload_stats': attached.upload_stats}
+
+
+def _known_key(key: str) -> bool:
+    # runs on the threads of the upload pool, which do not outlive the request
+    try:
+        return StorageAttachment.objects.filter(key=key).exists()
+    finally:
+        connection.close()
+
+
+def _save_batch(files: list, user) -> list:
+    stored = [file for file in files if file.error is None]
+    codecs = dict(StorageAttachment.objects.filter(key__in=[file.key for file in stored]).values_list('key', 'codec'))
+    with transaction.atomic():
+        attachments = StorageAttachment.objects.bulk_create([
+            StorageAttachment(filename=file.filename, content_type=file.content_type, key=file.key, size=file.size,
+                              codec=codecs.get(file.key))
+            for file in stored
+        ])
+        for attachment in attachments:
+            AuditLog.log(user, f"Attachment created {attachment.filename}", resource=attachment)
+    attachments = dict(zip([id(file) for file in stored], attachments))
+
+    results = []
+    for file in files:
+        result = {'field': file.field, 'filename': file.filename, 'size': file.size, 'key': file.key}
+        if file.error is not None:
+            results.append({**result, 'error': file.error})
+        else:
+            results.append({**result, 'deduplicated': file.deduplicated,
+                            'attachment': model_serializer(attachments[id(file)])})
+    return results
+
+
+@router.post("/api/attachments/batch")
+async def batch_upload(request: Request, user=Depends(get_user('create'))):
+    """upload every file of a multipart body, the results are given in the order of the parts
+
+    A file whose upload failed gets an error instead of an attachment, the others are still created.
+    """
+    with tempfile.TemporaryDirectory() as tempdir:
+        try:
+            parser = BatchUploadParser(request.headers.get('content-type', ''), tempdir, StorageAttachment.store_file,
+                                       _known_key)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        try:
+            async for chunk in request.stream():
+                # parsing, hashing and writing the parts to disk block, they are kept off the event loop
+                await run_in_threadpool(parser.write, chunk)
+            files = await run_in_threadpool(parser.finish)
+        except ValueError as e:
+            await run_in_threadpool(parser.abort)
+            raise HTTPException(status_code=422, detail=str(e))
+        except BaseException:
+            await run_in_threadpool(parser.abort)
+            raise
+        results = await run_in_threadpool(_save_batch, files, user)
+    return {'items': results}
@@ -0,0 +1,95 @@
+from typing import Optional
+
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.db.models import Q
+from fastapi import APIRouter, HTTPException, Query, Depends
+from pydantic import BaseModel
+
+from .serializers import model_serializer
+from ...dependencies import get_user
+from ...models import AuditLog, DerivedChannel
+from ...utils.derived_channels import validate_expression
+
+router = APIRouter()
+
+
+class DerivedChannelPayload(BaseModel):
+    name: str
+    expression: str
+    unit: Optional[str] = None
+    description: Optional[str] = None
+
+
+def _save(derived_channel: DerivedChannel):
+    try:
+        validate_expression(derived_channel.expression)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        derived_channel.save()
+    except IntegrityError as e:
+        raise HTTPException(status_code=422, detail="Name already taken.") if 'derived_channels_name' in str(e) else e
+
+
+@router.get("/api/derived_channels")
+def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+          query: str = Query(None), sort_by: str = Query('name'), sort_desc: bool = Query(False)):
+    db_query = DerivedChannel.objects
+    if query is not None and query.strip() != '':
+        db_query = db_query.filter(Q(name__icontains=query) | Q(expression__icontains=query))
+    if sort_by is not None:
+        order_field = f"-{sort_by}" if sort_desc else sort_by
+        db_query = db_query.order_by(order_field)
+    paginator = Paginator(db_query.all(), per_page)
+    items = [model_serializer(derived_channel) for derived_channel in paginator.get_page(page).object_list]
+    return {
+        "current_page": page,
+        "last_page": paginator.num_pages,
+        "total": paginator.count,
+        "items": items,
+    }
+
+
+@router.post("/api/derived_channels")
+def create(payload: DerivedChannelPayload, user=Depends(get_user('create'))):
+    derived_channel = DerivedChannel(
+        name=payload.name,
+        expression=payload.expression,
+        unit=payload.unit,
+        description=payload.description,
+    )
+    _save(derived_channel)
+    AuditLog.log(user, "Derived channel created", resource=derived_channel)
+    return model_serializer(derived_channel)
+
+
+@router.get("/api/derived_channels/{id}")
+def show(id: int, user=Depends(get_user('read'))):
+    derived_channel = DerivedChannel.objects.filter(id=id).first()
+    if not derived_channel:
+        raise HTTPException(status_code=404, detail="Derived channel not found")
+    return model_serializer(derived_channel)
+
+
+@router.patch("/api/derived_channels/{id}")
+def update(id: int, payload: DerivedChannelPayload, user=Depends(get_user('update'))):
+    derived_channel = DerivedChannel.objects.filter(id=id).first()
+    if not derived_channel:
+        raise HTTPException(status_code=404, detail="Derived channel not found")
+
+    for key, value in payload.dict(exclude_unset=True).items():
+        setattr(derived_channel, key, value)
+    _save(derived_channel)
+    AuditLog.log(user, "Derived channel updated", resource=derived_channel)
+    return model_serializer(derived_channel)
+
+
+@router.delete("/api/derived_channels/{id}")
+def destroy(id: int, user=Depends(get_user('delete'))):
+    derived_channel = DerivedChannel.objects.filter(id=id).first()
+    if not derived_channel:
+        raise HTTPException(status_code=404, detail="Derived channel not found")
+    derived_channel.delete()
+    AuditLog.log(user, "Derived channel deleted", resource=derived_channel)
+    return model_serializer(derived_channel)
@@ -5,7 +5,7 @@ from typing import List, Dict
 from django.core.paginator import Paginator
 from django.db import IntegrityError
 from django.db.models import Q
-from fastapi import APIRouter, Query, HTTPException, Form, Depends, Response
+from fastapi import APIRouter, Query, HTTPException, Form, Depends, Response, Request
 
 from .serializers import model_serializer
 from ...actions.generate_magnet_directory import generate_magnet_directory
@@ -13,19 +13,26 @@ from ...dependencies import get_user
 from ...models import Magnet, AuditLog
 from ...models.magnet import MagnetType
 from ...models.status import Status
+from ...utils.metadata_filters import filter_by_metadata
 
 router = APIRouter()
 
 
 @router.get("/api/magnets")
-def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+def index(request: Request, user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
           query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False),
-          status: List[str] = Query(default=None, alias="status[]")):
+          status: List[str] = Query(default=None, alias="status[]"),
+          metadata_contains: str = Query(None),
+          metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     db_query = Magnet.objects.prefetch_related('sitemagnet_set', 'meshattachment_set__attachment')
     if query is not None and query.strip() != '':
         db_query = db_query.filter(Q(name__icontains=query))
     if status is not None:
         db_query = db_query.filter(Q(status__in=status))
+    try:
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
         db_query = db_query.order_by(order_field)
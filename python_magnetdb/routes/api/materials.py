@@ -1,15 +1,16 @@
-from typing import Optional
+from typing import Optional, List
 
 from django.core.paginator import Paginator
 from django.db import IntegrityError
 from django.db.models import Q
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from pydantic import BaseModel
 
 from .serializers import model_serializer
 from ...dependencies import get_user
 from ...models import AuditLog
 from ...models.material import Material
+from ...utils.metadata_filters import filter_by_metadata
 
 router = APIRouter()
 
@@ -33,11 +34,17 @@ class MaterialPayload(BaseModel):
 
 
 @router.get("/api/materials")
-def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
-          query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False)):
+def index(request: Request, user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+          query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False),
+          metadata_contains: str = Query(None),
+          metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     db_query = Material.objects
     if query is not None and query.strip() != '':
         db_query = db_query.filter(Q(name__icontains=query))
+    try:
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
         db_query = db_query.order_by(order_field)
@@ -4,7 +4,7 @@ from typing import List
 from django.core.paginator import Paginator
 from django.db import IntegrityError
 from django.db.models import Q
-from fastapi import APIRouter, Query, HTTPException, Depends, UploadFile
+from fastapi import APIRouter, Query, HTTPException, Depends, UploadFile, Request
 from fastapi import Response
 from fastapi.params import Form, File
 
@@ -12,16 +12,19 @@ from .serializers import model_serializer
 from ...dependencies import get_user
 from ...models import Part, Material, AuditLog, StorageAttachment
 from ...models.part import PartType
+from ...utils.metadata_filters import filter_by_metadata
 from ...utils.yaml_json import yaml_to_json
 
 router = APIRouter()
 
 
 @router.get("/api/parts")
-def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+def index(request: Request, user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
           query: str = Query(None), sort_by: str = Query("created_at"), sort_desc: bool = Query(False),
           status: List[str] = Query(default=None, alias="status[]"),
-          type: List[str] = Query(default=None, alias="type[]")):
+          type: List[str] = Query(default=None, alias="type[]"),
+          metadata_contains: str = Query(None),
+          metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     db_query = Part.objects
     if status is not None and len(status) > 0:
         db_query = db_query.filter(status__in=status)
@@ -29,6 +32,10 @@ def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(d
         db_query = db_query.filter(type__in=type)
     if query is not None and query.strip() != '':
         db_query = db_query.filter(Q(name__icontains=query))
+    try:
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
         db_query = db_query.order_by(order_field)
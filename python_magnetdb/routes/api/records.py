@@ -1,28 +1,260 @@
+import io
 import json
-from typing import Optional
-
-from datetime import datetime
-
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from os import getenv
+from traceback import print_exception
+from typing import Optional, List
+
+import numpy as np
 import pandas as pd
 from django.core.paginator import Paginator
+from django.db import connection
 from django.db.models import Q
 from pydantic import BaseModel
-from fastapi import APIRouter, Query, HTTPException, Form, UploadFile, File, Depends
+from fastapi import APIRouter, Query, HTTPException, Form, UploadFile, File, Depends, Response, Request
 
 from .serializers import model_serializer
+from ...actions.live_record import ChunkOutOfOrder, append_record_chunk, finalize_live_record, read_chunk
+from ...actions.process_record import process_record
 from ...dependencies import get_user
-from ...models import Record, Site, StorageAttachment, AuditLog
+from ...models import Record, Site, StorageAttachment, AuditLog, DerivedChannel, RecordEventType
+from ...utils.derived_channels import channel_columns, channel_key, evaluate_channel, expand_channels
+from ...utils.downsampling import SamplingMode, downsample_series
+from ...utils.metadata_filters import filter_by_metadata
+from ...utils.record_data import read_record_txt, read_record_parquet, read_record_parquet_columns, offset_range, \
+    read_record_range, record_storage_codec
+from ...utils.record_events import event_window
+from ...utils.record_formats import RecordFormat, arrow_media_type, encode_column, to_arrow, to_columnar
+from ...utils.record_overlay import OverlayAlignment, alignment_offset, resample
+from ...utils.record_pyramid import read_pyramid_columns, read_pyramid_level
+from ...utils.record_statistics import filter_by_statistics
+from ...utils.record_time_axis import spread_duplicate_seconds
 from ...utils.record_visualization import columns as columns_with_name
+from ...utils.storage_stream import RangedReader
 
 router = APIRouter()
 
 
+class _RecordFrameCache:
+    """bounded LRU of parsed records, or of some columns of them, keyed by the content hash of their attachment
+
+    A key always designates the same file content, so entries never need to be invalidated. Cached frames
+    are shared between requests and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str, load):
+        frame = self.lookup(key)
+        if frame is None:
+            frame = load()
+            self.put(key, frame)
+        return frame
+
+    def lookup(self, key: str):
+        """cached frame or None, counted as a hit or a miss"""
+        with self.lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                return self.frames[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        if size <= self.max_bytes:
+            with self.lock:
+                if key not in self.frames:
+                    self.frames[key] = (frame, size)
+                    self.bytes += size
+                while self.bytes > self.max_bytes:
+                    (_, (_, evicted_size)) = self.frames.popitem(last=False)
+                    self.bytes -= evicted_size
+
+    def peek(self, key: str):
+        """cached frame or None, without loading it nor counting the lookup"""
+        with self.lock:
+            return self.frames[key][0] if key in self.frames else None
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.frames),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_record_frames = _RecordFrameCache(int(getenv('RECORD_CACHE_MAX_BYTES') or 512 * 1024 * 1024))
+# parquet files (pyramids, sidecars of records not cached) are read by ranged requests of at least this size
+parquet_read_size = 256 * 1024
+
+
+def _read_record_data(record: Record):
+    if record.parquet_attachment is not None:
+        return read_record_parquet(BytesIO(record.parquet_attachment.download().read()))
+    return read_record_txt(record.attachment.download())
+
+
+def _open_parquet(attachment: StorageAttachment):
+    """seekable file over a parquet attachment, read by ranged requests unless it is stored compressed"""
+    size = attachment.content_size()
+    if attachment.codec is None and size is not None:
+        return io.BufferedReader(RangedReader(attachment, size), buffer_size=parquet_read_size)
+    return BytesIO(attachment.download().read())
+
+
+def _record_columns(record: Record, parquet=None) -> list:
+    """columns of a record, read from the footer of its sidecar and cached as an empty frame"""
+    key = f"{record.attachment.key}:columns"
+    schema = _record_frames.lookup(key)
+    if schema is None:
+        if parquet is None:
+            parquet = _open_parquet(record.parquet_attachment)
+        schema = pd.DataFrame(columns=read_record_parquet_columns(parquet))
+        _record_frames.put(key, schema)
+    return schema.columns.tolist()
+
+
+def _read_record_columns(record: Record, columns: list, definitions: list):
+    """(data, available columns) of a record not cached whole, the columns needed for columns are read from its
+    sidecar and cached one by one
+
+    Reading every column to fill the cache would cost the full sidecar for a request showing a couple of them.
+    """
+    parquet = None
+    if _record_frames.peek(f"{record.attachment.key}:columns") is None:
+        parquet = _open_parquet(record.parquet_attachment)
+    available_columns = _record_columns(record, parquet)
+    channels = expand_channels(definitions, available_columns)
+    needed = [column for column in channel_columns(['t'] + columns, channels) if column in available_columns]
+    frames = {column: _record_frames.lookup(f"{record.attachment.key}:column:{column}") for column in needed}
+    missing = [column for (column, frame) in frames.items() if frame is None]
+    if len(missing) > 0:
+        if parquet is None:
+            parquet = _open_parquet(record.parquet_attachment)
+        data = read_record_parquet(parquet, columns=missing)
+        for column in missing:
+            frames[column] = data[[column]]
+            _record_frames.put(f"{record.attachment.key}:column:{column}", frames[column])
+    if len(frames) == 0:
+        return pd.DataFrame(), available_columns
+    return pd.concat(frames.values(), axis=1), available_columns
+
+
+def _load_record_window(record: Record, x_min: float, x_max: float):
+    """rows with x_min <= t <= x_max, only the part of the raw file holding them is downloaded and parsed"""
+    (offset, length) = offset_range(record.offset_index, x_min, x_max)
+    stream = record.attachment.download_range(offset, length)
+    try:
+        return read_record_range(stream, record.offset_index, x_min, x_max)
+    finally:
+        stream.close()
+        stream.release_conn()
+
+
+def _load_live_data(record: Record, since: float = None):
+    """rows of a live record, only the chunks holding rows after since are downloaded"""
+    chunks = record.recordchunk_set.prefetch_related('attachment').order_by('sequence')
+    if since is not None:
+        # chunks hold whole seconds, the ones ending in the second of since hold rows of it as well
+        chunks = chunks.filter(last_t__gte=math.floor(since))
+    # chunks are immutable once stored, they are cached like the parsed records
+    frames = [_record_frames.get(chunk.attachment.key, lambda: read_chunk(chunk)) for chunk in chunks]
+    if len(frames) == 0:
+        columns = record.recordchunk_set.order_by('-sequence').values_list('columns', flat=True).first()
+        return pd.DataFrame(columns=columns or [])
+    data = pd.concat(frames, ignore_index=True)
+    # rows sharing a second are spread inside it once the chunks are put back together, as the finalized record
+    # will be, only the first second may be partial and it is before since
+    timestamps = spread_duplicate_seconds(data['timestamp'])
+    return data.assign(t=data['t'] + (timestamps - data['timestamp']).dt.total_seconds(), timestamp=timestamps)
+
+
+def _load_record_data(record: Record):
+    if record.live:
+        return _load_live_data(record)
+    return _record_frames.get(record.attachment.key, lambda: _read_record_data(record))
+
+
+def _record_key(record: Record):
+    """key the derived channels of a record are cached under, None while its rows keep changing"""
+    return record.attachment.key if not record.live else None
+
+
+def _select_columns(data, columns: list, channels: dict, record_key: str = None):
+    """data restricted to columns, derived channels among them are computed and cached along the record when
+    record_key is given"""
+    unavailable = [column for column in columns if column not in data.columns and column not in channels]
+    if len(unavailable) > 0:
+        raise HTTPException(status_code=422, detail=f"Unknown columns: {unavailable}")
+    derived = [column for column in columns if column not in data.columns]
+    if len(derived) == 0:
+        return data[columns]
+
+    frames = [data[[column for column in columns if column in data.columns]]]
+    for name in derived:
+        (expression, _) = channels[name]
+        if record_key is None:
+            frames.append(evaluate_channel(data, name, expression))
+        else:
+            frames.append(_record_frames.get(
+                channel_key(record_key, name, expression), lambda: evaluate_channel(data, name, expression)
+            ))
+    return pd.concat(frames, axis=1)[columns]
+
+
+def _json_compliant(data: pd.DataFrame) -> pd.DataFrame:
+    """data with NaN and infinite values replaced by None, JSON responses cannot hold them (a derived channel
+    dividing by a zero current for instance)"""
+    data = data.replace([np.inf, -np.inf], np.nan)
+    return data.astype(object).where(data.notna(), None)
+
+
+def _column_units(available_columns: list, channels: dict) -> dict:
+    columns = {column: columns_with_name[column] for column in available_columns}
+    for (name, (_, unit)) in channels.items():
+        columns[name] = unit
+    return columns
+
+
+def _load_pyramid_level(record: Record, x_min: float, x_max: float, y: list, n_points: int):
+    """buckets of the level answering a zoom, only the footer of the pyramid and the row groups and columns read are
+    downloaded"""
+    pyramid = _open_parquet(record.pyramid_attachment)
+    x_min = x_min if x_min is not None else -math.inf
+    x_max = x_max if x_max is not None else math.inf
+    return read_pyramid_level(pyramid, x_min, x_max, y, n_points), read_pyramid_columns(pyramid)
+
+
 @router.get("/api/records")
-def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
-          query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False)):
+def index(request: Request, user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+          query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False),
+          stats: List[str] = Query(default=None, alias="stats[]"),
+          metadata_contains: str = Query(None),
+          metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     db_query = Record.objects
     if query is not None and query.strip() != '':
         db_query = db_query.filter(Q(name__icontains=query))
+    try:
+        if stats is not None:
+            db_query = filter_by_statistics(db_query, stats)
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
         db_query = db_query.order_by(order_field)
@@ -36,6 +268,69 @@ def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(d
     }
 
 
+@router.get("/api/records/cache")
+def cache(user=Depends(get_user('admin'))):
+    return _record_frames.stats()
+
+
+@router.get("/api/records/overlay")
+def overlay(user=Depends(get_user('read')), ids: str = Query(...), y: str = Query(...),
+            align: OverlayAlignment = Query(OverlayAlignment.START), field: float = Query(None),
+            points: int = Query(1000, gt=1, le=100000)):
+    try:
+        ids = list(dict.fromkeys(int(record_id) for record_id in ids.split(',')))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma separated list of record ids")
+    y = y.split(',')
+    records = Record.objects.prefetch_related('attachment', 'parquet_attachment').in_bulk(ids)
+    missing = [record_id for record_id in ids if record_id not in records]
+    if len(missing) > 0:
+        raise HTTPException(status_code=404, detail=f"Records not found: {missing}")
+
+    columns = list(dict.fromkeys(['t'] + y + (['Field'] if align == OverlayAlignment.FIELD else [])))
+    definitions = list(DerivedChannel.objects.all())
+
+    def load(record_id):
+        try:
+            data = _load_record_data(records[record_id])
+            channels = expand_channels(definitions, data.columns)
+            return _select_columns(data, columns, channels, _record_key(records[record_id])), channels
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Record {record_id}: {e.detail}")
+        finally:
+            # live records are read through the ORM, each thread opened its own connection
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=min(len(ids), 8)) as executor:
+        loaded = dict(zip(ids, executor.map(load, ids)))
+    frames = {record_id: data for (record_id, (data, _)) in loaded.items()}
+    units = {}
+    for (_, channels) in loaded.values():
+        units.update(_column_units([column for column in y if column in columns_with_name], channels))
+
+    offsets = {record_id: alignment_offset(data, y[0], align, field) for (record_id, data) in frames.items()}
+    (grid, series) = resample({
+        record_id: ((data['t'] - offsets[record_id]).to_numpy(), data) for (record_id, data) in frames.items()
+    }, y, points)
+    return {
+        't': encode_column(grid, np.float64),
+        'series': {
+            str(record_id): {y_value: encode_column(values, np.float32) for (y_value, values) in series[record_id].items()}
+            for record_id in ids
+        },
+        'offsets': {str(record_id): offset for (record_id, offset) in offsets.items()},
+        'columns': {column: units.get(column) for column in y},
+    }
+
+
+def _process_record(record: Record):
+    try:
+        process_record(record)
+    except Exception as err:
+        # the record stays usable without its derived files, visualize falls back to the raw attachment
+        print_exception(None, err, err.__traceback__)
+
+
 @router.post("/api/records")
 def create(
     user=Depends(get_user('create')),
@@ -50,10 +345,11 @@ def create(
         raise HTTPException(status_code=404, detail="Site not found")
 
     record = Record(name=name, description=description)
-    record.attachment = StorageAttachment.upload(attachment)
+    record.attachment = StorageAttachment.upload(attachment, record_storage_codec)
     record.metadata = json.loads(metadata)
     record.site = site
     record.save()
+    _process_record(record)
     AuditLog.log(user, f"Record created {attachment.filename}", resource=record)
     return model_serializer(record)
 
@@ -84,9 +380,59 @@ def clicreate(payload: RecordPayload, user=Depends(get_user('create'))):
     record.site = site
     print(f'record/clicreate: associate site done')
     record.save()
+    _process_record(record)
     AuditLog.log(user, f"Record cli created {payload.name}", resource=record)
     return model_serializer(record)
 
+@router.post("/api/records/live")
+def create_live(
+    user=Depends(get_user('create')),
+    name: str = Form(...),
+    description: str = Form(None),
+    site_id: str = Form(...),
+    metadata: str = Form('{}')
+):
+    site = Site.objects.filter(id=site_id).first()
+    if not site:
+        raise HTTPException(status_code=404, detail="Site not found")
+
+    record = Record(name=name, description=description, site=site, metadata=json.loads(metadata), live=True)
+    record.save()
+    AuditLog.log(user, f"Live record created {name}", resource=record)
+    return model_serializer(record)
+
+
+@router.post("/api/records/{id}/chunks")
+def append_chunk(id: int, user=Depends(get_user('update')), sequence: int = Form(...), rows: UploadFile = File(...)):
+    record = Record.objects.filter(id=id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    if not record.live:
+        raise HTTPException(status_code=422, detail="Record is not live")
+
+    try:
+        chunk = append_record_chunk(record, sequence, rows.file.read())
+    except ChunkOutOfOrder as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return model_serializer(chunk)
+
+
+@router.post("/api/records/{id}/finalize")
+def finalize(id: int, user=Depends(get_user('update'))):
+    record = Record.objects.filter(id=id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    try:
+        record = finalize_live_record(record)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    AuditLog.log(user, "Record finalized", resource=record)
+    return model_serializer(record)
+
+
 @router.get("/api/records/{id}")
 def show(id: int, user=Depends(get_user('read'))):
     record = Record.objects.prefetch_related('attachment', 'site').get(id=id)
@@ -99,49 +445,124 @@ def show(id: int, user=Depends(get_user('read'))):
 @router.get("/api/records/{id}/visualize")
 def visualize(id: int, user=Depends(get_user('read')),
               x: str = Query(None), y: str = Query(None), auto_sampling: bool = Query(False),
+              sampling_mode: SamplingMode = Query(SamplingMode.LTTB), sampling_points: int = Query(500, gt=2),
               x_min: float = Query(None), x_max: float = Query(None),
-              y_min: float = Query(None), y_max: float = Query(None)):
-    record = Record.objects.prefetch_related('attachment').get(id=id)
+              y_min: float = Query(None), y_max: float = Query(None), since: float = Query(None),
+              format: RecordFormat = Query(RecordFormat.JSON)):
+    record = Record.objects.prefetch_related('attachment', 'parquet_attachment', 'pyramid_attachment').get(id=id)
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
 
-    # data prep
-    time_format = "%Y.%m.%d %H:%M:%S"
-    data = pd.read_csv(record.attachment.download(), sep=r'\s+', skiprows=1)
-    # cleanup: remove empty columns
-    data = data.loc[:, (data != 0.0).any(axis=0)]
-    t0 = datetime.strptime(data['Date'].iloc[0] + " " + data['Time'].iloc[0], time_format)
-    data["t"] = data.apply(
-        lambda row: (datetime.strptime(row.Date + " " + row.Time, time_format) - t0).total_seconds(),
-        axis=1
-    )
-    data["timestamp"] = data.apply(lambda row: datetime.strptime(row.Date + " " + row.Time, time_format), axis=1)
-
-    result = {}
+    definitions = list(DerivedChannel.objects.all())
+    points = None
+    envelope = None
     sampling_enabled = False
+    available_columns = None
+    cursor = None
     if x is not None and y is not None:
         y = y.split(',')
+        y_window = y_min is not None and y_max is not None
+
+        # use the coarsest precomputed level still giving enough points in the window
+        level = None
+        if auto_sampling is True and x == 't' and since is None and record.pyramid_attachment is not None:
+            (level, available_columns) = _load_pyramid_level(record, x_min, x_max, y, sampling_points)
+
+        if level is not None:
+            if x_min is not None and x_max is not None and y_window:
+                for y_value in y:
+                    level = level[(level[f'{y_value}.mean'] >= y_min) & (level[f'{y_value}.mean'] <= y_max)]
+            sampling_enabled = True
+            points = pd.DataFrame({'t': level['t'], **{y_value: level[f'{y_value}.mean'] for y_value in y}})
+            envelope = level
+        else:
+            # to handle chart resizing
+            window = x_min is not None and x_max is not None and y_window
+            # columns of the record when only some of them are read
+            record_columns = None
+            if window and x == 't' and record.offset_index and record.attachment.codec is None \
+                    and _record_frames.peek(record.attachment.key) is None:
+                (data, record_key) = (_load_record_window(record, x_min, x_max), None)
+            elif record.live:
+                (data, record_key) = (_load_live_data(record, since), None)
+            elif record.parquet_attachment is not None and _record_frames.peek(record.attachment.key) is None:
+                (data, record_columns) = _read_record_columns(record, [x] + y, definitions)
+                record_key = record.attachment.key
+            else:
+                (data, record_key) = (_load_record_data(record), record.attachment.key)
+            # incremental polling: only the rows after the cursor returned by the previous call are sent
+            if since is not None:
+                data = data[data['t'] > since]
+            cursor = float(data['t'].iloc[-1]) if len(data) > 0 else since
+            available_columns = record_columns if record_columns is not None else data.columns.tolist()
+            channels = expand_channels(definitions, available_columns)
+            points = _select_columns(data, list(dict.fromkeys([x] + y)), channels, record_key)
+
+            if window:
+                points = points[(points[x] >= x_min) & (points[x] <= x_max)]
+                for y_value in y:
+                    points = points[(points[y_value] >= y_min) & (points[y_value] <= y_max)]
+
+            # compute if sampling is required, each y series is downsampled on its own to keep its peaks
+            sampling_enabled = auto_sampling is True and len(points) > sampling_points
+            if sampling_enabled:
+                points = downsample_series(points, x, y, sampling_points, sampling_mode)
+    elif not record.live and record.parquet_attachment is not None \
+            and _record_frames.peek(record.attachment.key) is None:
+        available_columns = _record_columns(record)
+    else:
+        available_columns = _load_record_data(record).columns.tolist()
+
+    columns = _column_units(available_columns, expand_channels(definitions, available_columns))
+
+    if format == RecordFormat.ARROW:
+        if points is None:
+            raise HTTPException(status_code=422, detail="x and y are required for the arrow format")
+        metadata = {'columns': columns, 'sampling_enabled': sampling_enabled, 'cursor': cursor, 'live': record.live}
+        return Response(content=to_arrow(points, x, y, envelope, metadata), media_type=arrow_media_type)
+    elif format == RecordFormat.COLUMNAR:
+        result = to_columnar(points, x, y, envelope) if points is not None else None
+        return {
+            'result': result, 'columns': columns, 'sampling_enabled': sampling_enabled, 'cursor': cursor,
+            'live': record.live,
+        }
 
-        # to handle chart resizing
-        if x_min is not None and x_max is not None and y_min is not None and y_max is not None:
-            data = data[(data[x] >= x_min) & (data[x] <= x_max)]
-            for y_value in y:
-                data = data[(data[y_value] >= y_min) & (data[y_value] <= y_max)]
-
-        # compute if sampling is required
-        sampling_enabled = auto_sampling is True and len(data) > 500
-        sampling_factor = round(data['timestamp'].count() / 500) if sampling_enabled else 1
+    result = {}
+    if points is not None:
+        points = _json_compliant(points)
+        points = points[points[x].notna()]
+        result = dict(zip(points[x].tolist(), points[y].values.tolist()))
+    if envelope is not None:
+        envelope = _json_compliant(envelope)
+        envelope = {
+            y_value: {'min': envelope[f'{y_value}.min'].tolist(), 'max': envelope[f'{y_value}.max'].tolist()}
+            for y_value in y
+        }
+    return {
+        'result': result, 'columns': columns, 'sampling_enabled': sampling_enabled, 'envelope': envelope,
+        'cursor': cursor, 'live': record.live,
+    }
 
-        # rendering values and applying sampling factor is needed
-        for (index, values) in enumerate(data[[x] + y].values):
-            if index % sampling_factor == 0:
-                result[values[0]] = values[1:].tolist()
 
-    columns = {}
-    for column in data.columns.tolist():
-        columns[column] = columns_with_name[column]
+@router.get("/api/records/{id}/events")
+def events(id: int, user=Depends(get_user('read')),
+           type: List[RecordEventType] = Query(default=None, alias="type[]"),
+           column: List[str] = Query(default=None, alias="column[]")):
+    record = Record.objects.filter(id=id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
 
-    return {'result': result, 'columns': columns, 'sampling_enabled': sampling_enabled}
+    db_query = record.recordevent_set.order_by('t_start', 'column')
+    if type is not None:
+        db_query = db_query.filter(type__in=[event_type.value for event_type in type])
+    if column is not None:
+        db_query = db_query.filter(column__in=column)
+    items = []
+    for event in db_query:
+        item = model_serializer(event)
+        (item['x_min'], item['x_max']) = event_window(event.t_start, event.t_end)
+        items.append(item)
+    return {'items': items}
 
 
 @router.patch("/api/records/{id}")
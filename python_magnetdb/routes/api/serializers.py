@@ -3,7 +3,7 @@ from django.db.models import DateTimeField
 from django.db.models.fields.related import ForeignKey
 from django.db.models.fields.related_descriptors import ReverseManyToOneDescriptor
 
-from python_magnetdb.models import Site, Material, Part, Magnet, Simulation
+from python_magnetdb.models import Site, Material, Part, Magnet, Simulation, Record
 from python_magnetdb.models.magnet import MagnetType
 
 
@@ -107,12 +107,19 @@ def _simulation_post_processor(model: Simulation, res: dict):
     return res
 
 
+def _record_post_processor(model: Record, res: dict):
+    # byte offsets of the raw file, only used server side to read a window of it
+    res.pop('offset_index', None)
+    return res
+
+
 POST_PROCESSORS = {
     Site: _site_post_processor,
     Material: _material_post_processor,
     Part: _part_post_processor,
     Magnet: _magnet_post_processor,
     Simulation: _simulation_post_processor,
+    Record: _record_post_processor,
 }
 
 
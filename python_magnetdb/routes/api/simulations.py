@@ -2,7 +2,8 @@ import json
 from typing import Union, List, Optional
 
 from django.core.paginator import Paginator
-from fastapi import APIRouter, HTTPException, Depends, Form, Query
+from fastapi import APIRouter, HTTPException, Depends, Form, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from python_magnetsetup.config import loadconfig, supported_methods, supported_models
@@ -11,21 +12,31 @@ from .serializers import model_serializer
 from ... import worker
 from ...actions.generate_simulation_config import generate_simulation_config
 from ...actions.get_simulation_measures import get_simulation_measures
+from ...actions.simulation_outputs import export_simulation_outputs
 from ...dependencies import get_user
 from ...models import Simulation, Magnet, Site, SimulationCurrent, AuditLog, MeshAttachment
+from ...utils.async_stream import stream_object
+from ...utils.metadata_filters import filter_by_metadata
 
 router = APIRouter()
 
 
 @router.get("/api/simulations")
 def index(
+    request: Request,
     user=Depends(get_user("read")),
     page: int = 1,
     per_page: int = Query(default=25, lte=100),
     sort_by: str = Query('created_at'),
     sort_desc: bool = Query(False),
+    metadata_contains: str = Query(None),
+    metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]"),
 ):
     db_query = Simulation.objects.prefetch_related("magnet", "site", "owner")
+    try:
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
         db_query = db_query.order_by(order_field)
@@ -220,3 +231,45 @@ def measures(id: int, measure_name: str = Query(None), user=Depends(get_user("re
         raise HTTPException(status_code=404, detail="Measures not found")
 
     return measures
+
+
+@router.get("/api/simulations/{id}/files")
+def output_files(id: int, user=Depends(get_user("read"))):
+    simulation = Simulation.objects.filter(id=id).first()
+    if not simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+
+    return {
+        'items': [
+            {'path': file.path, 'size': file.size, 'key': file.attachment.key, 'attachment_id': file.attachment_id}
+            for file in simulation.simulationoutputfile_set.select_related('attachment').order_by('path')
+        ],
+    }
+
+
+@router.get("/api/simulations/{id}/files/{path:path}")
+def output_file(id: int, path: str, user=Depends(get_user("read"))):
+    simulation = Simulation.objects.filter(id=id).first()
+    if not simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    file = simulation.simulationoutputfile_set.select_related('attachment').filter(path=path).first()
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return StreamingResponse(stream_object(file.attachment.download()), media_type=file.attachment.content_type, headers={
+        'content-length': str(file.size),
+        'content-disposition': f'attachment; filename="{file.attachment.filename}"',
+    })
+
+
+@router.get("/api/simulations/{id}/output.tar.gz")
+def output_archive(id: int, user=Depends(get_user("read"))):
+    simulation = Simulation.objects.filter(id=id).first()
+    if not simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    if not simulation.simulationoutputfile_set.exists():
+        raise HTTPException(status_code=404, detail="Simulation has no output files")
+
+    return StreamingResponse(export_simulation_outputs(simulation), media_type="application/gzip", headers={
+        'content-disposition': f'attachment; filename="simulation-{simulation.id}-output.tar.gz"',
+    })
@@ -4,7 +4,7 @@ from typing import List
 
 from django.core.paginator import Paginator
 from django.db import IntegrityError
-from fastapi import Depends, APIRouter, HTTPException, Query, UploadFile, File, Form, Response
+from fastapi import Depends, APIRouter, HTTPException, Query, UploadFile, File, Form, Response, Request
 
 from .serializers import model_serializer
 from ...actions.generate_simulation_config import generate_site_config
@@ -13,14 +13,18 @@ from ...models import StorageAttachment
 from ...models.audit_log import AuditLog
 from ...models.site import Site
 from ...models.status import Status
+from ...utils.metadata_filters import filter_by_metadata
+from ...utils.record_statistics import filter_by_statistics
 
 router = APIRouter()
 
 
 @router.get("/api/sites")
-def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
+def index(request: Request, user=Depends(get_user('read')), page: int = 1, per_page: int = Query(default=25, lte=100),
           query: str = Query(None), sort_by: str = Query('created_at'), sort_desc: bool = Query(False),
-          status: List[str] = Query(default=None, alias="status[]")):
+          status: List[str] = Query(default=None, alias="status[]"),
+          metadata_contains: str = Query(None),
+          metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     db_query = Site.objects.prefetch_related('sitemagnet_set__magnet', 'meshattachment_set__attachment')
     if sort_by is not None:
         order_field = f"-{sort_by}" if sort_desc else sort_by
@@ -29,6 +33,10 @@ def index(user=Depends(get_user('read')), page: int = 1, per_page: int = Query(d
         db_query = db_query.filter(name__icontains=query)
     if status is not None:
         db_query = db_query.filter(status__in=status)
+    try:
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     paginator = Paginator(db_query.all(), per_page)
     items = [model_serializer(site) for site in paginator.get_page(page).object_list]
 
@@ -99,13 +107,24 @@ def update(
     return model_serializer(site)
 
 @router.get("/api/sites/{id}/records")
-def records(id: int, user=Depends(get_user('read'))):
+def records(id: int, request: Request, user=Depends(get_user('read')),
+            stats: List[str] = Query(default=None, alias="stats[]"),
+            metadata_contains: str = Query(None),
+            metadata_has_key: List[str] = Query(default=None, alias="metadata_has_key[]")):
     site = Site.objects.prefetch_related('record_set').get(id=id)
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
 
+    db_query = site.record_set.all()
+    try:
+        if stats is not None:
+            db_query = filter_by_statistics(db_query, stats)
+        db_query = filter_by_metadata(db_query, request.query_params, metadata_contains, metadata_has_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
     result = []
-    for record in site.record_set.all():
+    for record in db_query:
         result.append(model_serializer(record))
     return {'records': result}
 
@@ -8,23 +8,24 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'python_magnetdb.settings')
 import django
 django.setup()
 
-import re
 from datetime import datetime
 from os import path, getenv
 
+from python_magnetdb.actions.process_record import process_record
 from python_magnetdb.models import StorageAttachment
 from python_magnetdb.models.magnet import Magnet
 from python_magnetdb.models.material import Material
 from python_magnetdb.models.part import Part
 from python_magnetdb.models.record import Record
 from python_magnetdb.models.site import Site
+from python_magnetdb.utils.record_data import extract_date_from_filename, record_storage_codec
 
 data_directory = getenv('DATA_DIR')
 
 
-def upload_attachment(file: str) -> StorageAttachment:
+def upload_attachment(file: str, codec=None) -> StorageAttachment:
     try:
-        return StorageAttachment.raw_upload(path.basename(file), 'text/tsv', file)
+        return StorageAttachment.raw_upload(path.basename(file), 'text/tsv', file, codec)
     except Exception as e:
         print("failed to upload attachment: {}".format(e))
         return None
@@ -91,13 +92,6 @@ def create_magnet(obj):
     return magnet
 
 
-def extract_date_from_filename(filename):
-    for match in re.finditer(r".+_(\d{4}).(\d{2}).(\d{2})---(\d{2}):(\d{2}):(\d{2}).+", filename):
-        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)),
-                        int(match.group(4)), int(match.group(5)), int(match.group(6)))
-    return None
-
-
 def create_record(obj):
     """create a record from file for site"""
 
@@ -111,16 +105,21 @@ def create_record(obj):
         if created_at is None:
             created_at = datetime.now()
 
-        attachment = upload_attachment(path.join(data_directory, 'mrecords', file))
+        attachment = upload_attachment(path.join(data_directory, 'mrecords', file), record_storage_codec)
         if attachment is None:
             return None
 
-        return Record.objects.create(
+        record = Record.objects.create(
             name=path.basename(path.join(data_directory, 'mrecords', file)),
             created_at=created_at,
             attachment=attachment,
             site=site,
         )
+        try:
+            process_record(record, path.join(data_directory, 'mrecords', file))
+        except Exception as e:
+            print("failed to process record: {}".format(e))
+        return record
 
 
 def query_by_name(model_class, name: str):
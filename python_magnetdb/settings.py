@@ -46,3 +46,7 @@ USE_I18N = True
 USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# where attachments are stored: 's3' (MinIO/S3 bucket, see the S3_* variables) or 'local' (a directory)
+STORAGE_BACKEND = getenv('STORAGE_BACKEND') or 's3'
+STORAGE_LOCAL_ROOT = getenv('STORAGE_LOCAL_ROOT') or str(BASE_DIR / 'storage')
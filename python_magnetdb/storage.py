@@ -1,14 +1,324 @@
+import io
+import os
+import shutil
+import threading
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
 from os import getenv
 
+import certifi
+import urllib3
+from django.conf import settings
 from minio import Minio
+from minio.commonconfig import ComposeSource, CopySource
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
 
-s3_client = Minio(
-    getenv('S3_ENDPOINT'),
-    access_key=getenv("S3_ACCESS_KEY"),
-    secret_key=getenv("S3_SECRET_KEY"),
-    secure=False
-)
-s3_bucket = getenv("S3_BUCKET")
+StoredObject = namedtuple('StoredObject', ['name', 'size', 'last_modified'])
 
-if not s3_client.bucket_exists(s3_bucket):
-    s3_client.make_bucket(s3_bucket)
+chunk_size = 64 * 1024
+presigned_expiry = int(getenv('S3_PRESIGNED_EXPIRY') or 300)
+# largest object S3 copies in a single request
+max_copy_size = 5 * 1024 * 1024 * 1024
+
+
+class StorageBackend:
+    """flat namespace of immutable objects
+
+    Streams returned by get() have read(), stream(amt), close() and release_conn(), missing objects raise
+    FileNotFoundError.
+    """
+    supports_presigned = False
+
+    def get(self, name: str, offset: int = 0, length: int = None):
+        raise NotImplementedError()
+
+    def get_file(self, name: str, path: str):
+        raise NotImplementedError()
+
+    def put(self, name: str, stream, content_type: str):
+        """store a stream of unknown length"""
+        raise NotImplementedError()
+
+    def put_file(self, name: str, path: str, content_type: str):
+        raise NotImplementedError()
+
+    def copy(self, source: str, destination: str):
+        raise NotImplementedError()
+
+    def size(self, name: str) -> int:
+        raise NotImplementedError()
+
+    def remove(self, name: str):
+        """removing a missing object is not an error"""
+        raise NotImplementedError()
+
+    def remove_many(self, names: list) -> list:
+        """(name, message) of the objects that could not be removed"""
+        raise NotImplementedError()
+
+    def list(self):
+        """StoredObject of every object"""
+        raise NotImplementedError()
+
+    def presigned_get_url(self, name: str, expires: timedelta, response_headers: dict = None) -> str:
+        raise NotImplementedError()
+
+    def presigned_put_url(self, name: str, expires: timedelta) -> str:
+        raise NotImplementedError()
+
+
+class S3Backend(StorageBackend):
+    """objects of a MinIO/S3 bucket, clients are built on first use and share a connection pool sized for the
+    concurrent workers of a process"""
+
+    def __init__(self, endpoint: str, access_key: str, secret_key: str, bucket: str, secure: bool = False,
+                 public_endpoint: str = None, public_secure: bool = False, region: str = None,
+                 pool_size: int = 32, part_size: int = 16 * 1024 * 1024):
+        self.endpoint = endpoint
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.bucket = bucket
+        self.secure = secure
+        self.public_endpoint = public_endpoint
+        self.public_secure = public_secure
+        self.region = region
+        self.pool_size = pool_size
+        self.part_size = part_size
+        self.supports_presigned = public_endpoint is not None
+        self._client = None
+        self._public_client = None
+        self._lock = threading.Lock()
+
+    def _http_client(self):
+        timeout = timedelta(minutes=5).seconds
+        return urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=10, read=timeout),
+            maxsize=self.pool_size,
+            block=False,
+            cert_reqs='CERT_REQUIRED',
+            ca_certs=getenv('SSL_CERT_FILE') or certifi.where(),
+            retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        )
+
+    @property
+    def client(self) -> Minio:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    client = Minio(self.endpoint, access_key=self.access_key, secret_key=self.secret_key,
+                                   secure=self.secure, region=self.region, http_client=self._http_client())
+                    if not client.bucket_exists(self.bucket):
+                        client.make_bucket(self.bucket)
+                    self._client = client
+        return self._client
+
+    @property
+    def public_client(self) -> Minio:
+        # urls are signed for the endpoint clients reach, the region is given so signing does not query it
+        if self._public_client is None:
+            with self._lock:
+                if self._public_client is None:
+                    self._public_client = Minio(self.public_endpoint, access_key=self.access_key,
+                                                secret_key=self.secret_key, secure=self.public_secure,
+                                                region=self.region or 'us-east-1')
+        return self._public_client
+
+    def get(self, name: str, offset: int = 0, length: int = None):
+        try:
+            return self.client.get_object(self.bucket, name, offset=offset, length=length or 0)
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                raise FileNotFoundError(name)
+            raise
+
+    def get_file(self, name: str, path: str):
+        try:
+            self.client.fget_object(self.bucket, name, path)
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                raise FileNotFoundError(name)
+            raise
+
+    def put(self, name: str, stream, content_type: str):
+        self.client.put_object(self.bucket, name, stream, length=-1, part_size=self.part_size,
+                               content_type=content_type or 'application/octet-stream')
+
+    def put_file(self, name: str, path: str, content_type: str):
+        self.client.fput_object(self.bucket, name, path, content_type=content_type or 'application/octet-stream')
+
+    def copy(self, source: str, destination: str):
+        # a single CopyObject is limited to 5 GiB, larger objects are copied part by part on the server
+        try:
+            if self.size(source) > max_copy_size:
+                self.client.compose_object(self.bucket, destination, [ComposeSource(self.bucket, source)])
+            else:
+                self.client.copy_object(self.bucket, destination, CopySource(self.bucket, source))
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                raise FileNotFoundError(source)
+            raise
+
+    def size(self, name: str) -> int:
+        try:
+            return self.client.stat_object(self.bucket, name).size
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                raise FileNotFoundError(name)
+            raise
+
+    def remove(self, name: str):
+        self.client.remove_object(self.bucket, name)
+
+    def remove_many(self, names: list) -> list:
+        errors = self.client.remove_objects(self.bucket, [DeleteObject(name) for name in names])
+        return [(error.name, error.message) for error in errors]
+
+    def list(self):
+        for obj in self.client.list_objects(self.bucket, recursive=True):
+            yield StoredObject(obj.object_name, obj.size, obj.last_modified)
+
+    def presigned_get_url(self, name: str, expires: timedelta, response_headers: dict = None) -> str:
+        return self.public_client.presigned_get_object(self.bucket, name, expires=expires,
+                                                       response_headers=response_headers)
+
+    def presigned_put_url(self, name: str, expires: timedelta) -> str:
+        return self.public_client.presigned_put_object(self.bucket, name, expires=expires)
+
+
+class _LocalObject(io.RawIOBase):
+    """read-only stream over a part of a local file, shaped like the responses of the S3 client"""
+
+    def __init__(self, path: str, offset: int = 0, length: int = None):
+        self.file = open(path, 'rb')
+        self.file.seek(offset)
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)
+        if self.remaining is not None:
+            view = view[:self.remaining]
+        read = self.file.readinto(view)
+        if self.remaining is not None:
+            self.remaining -= read
+        return read
+
+    def stream(self, amt: int = chunk_size):
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class LocalBackend(StorageBackend):
+    """objects stored as files of a local directory, written through a temporary file renamed in place"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, name))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid object name: {name}")
+        return path
+
+    def _write(self, name: str, write):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, name: str, offset: int = 0, length: int = None):
+        return _LocalObject(self._path(name), offset, length)
+
+    def get_file(self, name: str, path: str):
+        shutil.copyfile(self._path(name), path)
+
+    def put(self, name: str, stream, content_type: str):
+        self._write(name, lambda f: shutil.copyfileobj(stream, f, chunk_size))
+
+    def put_file(self, name: str, path: str, content_type: str):
+        def write(f):
+            with open(path, 'rb') as source:
+                shutil.copyfileobj(source, f, chunk_size)
+        self._write(name, write)
+
+    def copy(self, source: str, destination: str):
+        with open(self._path(source), 'rb') as f:
+            self.put(destination, f, None)
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self._path(name))
+
+    def remove(self, name: str):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def remove_many(self, names: list) -> list:
+        errors = []
+        for name in names:
+            try:
+                self.remove(name)
+            except OSError as e:
+                errors.append((name, str(e)))
+        return errors
+
+    def list(self):
+        for (directory, _, filenames) in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                stat = os.stat(os.path.join(directory, filename))
+                yield StoredObject(
+                    os.path.relpath(os.path.join(directory, filename), self.root), stat.st_size,
+                    datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                )
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """backend selected by the STORAGE_BACKEND setting, built on first use"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if settings.STORAGE_BACKEND == 'local':
+                    _storage = LocalBackend(settings.STORAGE_LOCAL_ROOT)
+                elif settings.STORAGE_BACKEND == 's3':
+                    _storage = S3Backend(
+                        getenv('S3_ENDPOINT'),
+                        access_key=getenv("S3_ACCESS_KEY"),
+                        secret_key=getenv("S3_SECRET_KEY"),
+                        bucket=getenv("S3_BUCKET"),
+                        secure=False,
+                        public_endpoint=getenv('S3_PUBLIC_ENDPOINT'),
+                        public_secure=getenv('S3_PUBLIC_SECURE') == 'true',
+                        region=getenv('S3_REGION'),
+                        pool_size=int(getenv('S3_POOL_SIZE') or 32),
+                    )
+                else:
+                    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    return _storage
@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+
+import anyio
+
+# size of the chunks read from storage and sent to clients
+download_chunk_size = int(getenv('DOWNLOAD_CHUNK_SIZE') or 1024 * 1024)
+# chunks read ahead of a slow client, bounding the memory held by each download
+download_read_ahead = int(getenv('DOWNLOAD_READ_AHEAD') or 4)
+# blocking reads of downloads run there instead of the threadpool of the request handlers
+download_executor = ThreadPoolExecutor(
+    max_workers=int(getenv('DOWNLOAD_WORKERS') or 32), thread_name_prefix='download'
+)
+
+
+def _release(response):
+    response.close()
+    response.release_conn()
+
+
+async def stream_object(response, chunk_size: int = download_chunk_size, read_ahead: int = download_read_ahead):
+    """chunks of a storage response, for a StreamingResponse
+
+    Chunks are read on download_executor up to read_ahead chunks ahead of the client. When the client disconnects
+    the generator is cancelled: the read in flight is awaited, then the response is closed and its connection given
+    back to the pool.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=read_ahead)
+    read = None
+
+    async def produce():
+        nonlocal read
+        while True:
+            read = loop.run_in_executor(download_executor, response.read, chunk_size)
+            chunk = await asyncio.shield(read)
+            await queue.put(chunk)
+            if not chunk:
+                break
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            if producer.done():
+                # raises the error of a failed read, otherwise the end of the object is queued
+                producer.result()
+                chunk = await queue.get()
+            else:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, producer], return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                chunk = getter.result()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        producer.cancel()
+        # the request is being cancelled, the cleanup must not be
+        with anyio.CancelScope(shield=True):
+            if read is not None:
+                try:
+                    await asyncio.shield(read)
+                except Exception:
+                    pass
+            await loop.run_in_executor(download_executor, _release, response)
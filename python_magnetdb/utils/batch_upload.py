@@ -0,0 +1,140 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from python_magnetdb.utils.staging import staging_workers
+
+
+class BatchFile:
+    def __init__(self, field: str, filename: str, content_type: str, path: str):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.key = None
+        self.upload = None
+        # another file of the batch has the same content
+        self.duplicate = False
+
+    @property
+    def deduplicated(self) -> bool:
+        return self.duplicate or self.upload.result()
+
+    @property
+    def error(self):
+        if self.upload is None or self.upload.exception() is None:
+            return None
+        return str(self.upload.exception())
+
+
+class BatchUploadParser:
+    """multipart parser writing each file of a request to directory as it arrives
+
+    Files are hashed while written, as soon as one is complete its upload (store(key, path, content_type), skipped
+    when known(key) is true or when another file of the batch has the same content) is started on a thread pool so
+    uploads overlap with the reading of the next parts.
+    """
+
+    def __init__(self, content_type: str, directory: str, store, known, workers: int = staging_workers):
+        (content_type, params) = parse_options_header(content_type)
+        if content_type != b'multipart/form-data' or b'boundary' not in params:
+            raise ValueError("Expected a multipart/form-data body")
+        self.directory = directory
+        self.store = store
+        self.known = known
+        self.files = []
+        self.uploads = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.current = None
+        self.output = None
+        self.header_field = b''
+        self.header_value = b''
+        self.headers = {}
+        # set once the closing boundary is parsed, a body cut anywhere before it is truncated
+        self.complete = False
+        self.parser = MultipartParser(params[b'boundary'], callbacks={
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': lambda data, start, end: self._append_header('header_field', data[start:end]),
+            'on_header_value': lambda data, start, end: self._append_header('header_value', data[start:end]),
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+            'on_end': self._on_end,
+        })
+
+    def _append_header(self, name: str, data: bytes):
+        setattr(self, name, getattr(self, name) + data)
+
+    def _on_part_begin(self):
+        self.headers = {}
+
+    def _on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b''
+        self.header_value = b''
+
+    def _on_headers_finished(self):
+        (_, options) = parse_options_header(self.headers.get(b'content-disposition', b''))
+        if b'filename' not in options:
+            # plain form fields are ignored
+            self.current = None
+            return
+        path = os.path.join(self.directory, str(len(self.files)))
+        self.current = BatchFile(
+            options.get(b'name', b'').decode('utf-8'),
+            os.path.basename(options[b'filename'].decode('utf-8')),
+            self.headers.get(b'content-type', b'application/octet-stream').decode('latin-1'),
+            path,
+        )
+        self.output = open(path, 'wb')
+        self.files.append(self.current)
+
+    def _on_part_data(self, data, start, end):
+        if self.current is not None:
+            chunk = data[start:end]
+            self.current.digest.update(chunk)
+            self.current.size += len(chunk)
+            self.output.write(chunk)
+
+    def _on_part_end(self):
+        if self.current is None:
+            return
+        self.output.close()
+        file = self.current
+        file.key = file.digest.hexdigest()
+        file.duplicate = file.key in self.uploads
+        if not file.duplicate:
+            self.uploads[file.key] = self.executor.submit(self._upload, file)
+        file.upload = self.uploads[file.key]
+        self.current = None
+
+    def _on_end(self):
+        self.complete = True
+
+    def _upload(self, file: BatchFile) -> bool:
+        """True when the content was already stored"""
+        if self.known(file.key):
+            return True
+        self.store(file.key, file.path, file.content_type)
+        return False
+
+    def write(self, data: bytes):
+        self.parser.write(data)
+
+    def finish(self) -> list:
+        """wait for the uploads, files whose upload failed have an error"""
+        self.parser.finalize()
+        if not self.complete:
+            raise ValueError("Truncated multipart body")
+        self.executor.shutdown(wait=True)
+        return self.files
+
+    def abort(self):
+        if self.output is not None:
+            self.output.close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
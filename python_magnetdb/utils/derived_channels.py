@@ -0,0 +1,142 @@
+import ast
+import hashlib
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+from python_magnetdb.utils.record_visualization import coil_count, columns as native_columns
+
+identifier_pattern = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+binary_operators = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+unary_operators = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+comparison_operators = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+functions = {'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10}
+# not measures, they cannot take part in a channel
+non_numeric_columns = ['Date', 'Time', 'timestamp']
+
+
+def _references(expression: str) -> set:
+    return set(identifier_pattern.findall(expression)) & set(native_columns.keys())
+
+
+def _check_node(node):
+    """raise ValueError unless node only holds arithmetic and comparisons over record columns and numbers"""
+    if isinstance(node, ast.Expression):
+        return _check_node(node.body)
+    if isinstance(node, ast.BinOp) and type(node.op) in binary_operators:
+        return _check_node(node.left), _check_node(node.right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in unary_operators:
+        return _check_node(node.operand)
+    if isinstance(node, ast.Compare) and all(type(op) in comparison_operators for op in node.ops):
+        return [_check_node(child) for child in [node.left, *node.comparators]]
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"Invalid constant: {node.value!r}")
+        return
+    if isinstance(node, ast.Name):
+        if node.id not in native_columns or node.id in non_numeric_columns:
+            raise ValueError(f"Unknown column: {node.id}")
+        return
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in functions:
+        if len(node.args) != 1 or len(node.keywords) > 0:
+            raise ValueError(f"{node.func.id} takes a single argument")
+        return _check_node(node.args[0])
+    raise ValueError(f"Unsupported syntax: {ast.unparse(node) if isinstance(node, ast.expr) else type(node).__name__}")
+
+
+def _parse(expression: str) -> ast.Expression:
+    try:
+        tree = ast.parse(expression.replace('{i}', '1'), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    _check_node(tree)
+    return tree
+
+
+def _evaluate(node, frame: pd.DataFrame):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, frame)
+    if isinstance(node, ast.BinOp):
+        return binary_operators[type(node.op)](_evaluate(node.left, frame), _evaluate(node.right, frame))
+    if isinstance(node, ast.UnaryOp):
+        return unary_operators[type(node.op)](_evaluate(node.operand, frame))
+    if isinstance(node, ast.Compare):
+        (left, result) = (_evaluate(node.left, frame), True)
+        for (op, comparator) in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, frame)
+            result = result & comparison_operators[type(op)](left, right)
+            left = right
+        return result
+    if isinstance(node, ast.Constant):
+        # numpy scalars overflow to inf instead of raising or growing without bound like python numbers
+        return np.float64(node.value)
+    if isinstance(node, ast.Name):
+        return frame[node.id]
+    return functions[node.func.id](_evaluate(node.args[0], frame))
+
+
+def validate_expression(expression: str):
+    """raise ValueError unless expression is an arithmetic expression over record columns
+
+    Expressions are checked on their syntax tree, nothing is evaluated: only numbers, columns, arithmetic
+    operators, comparisons and a few numpy functions are allowed.
+    """
+    _parse(expression)
+    if len(_references(expression.replace('{i}', '1'))) == 0:
+        raise ValueError("Expressions must reference at least one column")
+
+
+def expand_channels(definitions, available_columns) -> dict:
+    """name -> (expression, unit) of the channels computable from available_columns
+
+    Definitions whose name contains {i} are expanded for every coil having all the referenced columns.
+    Other definitions only need one referenced column, the missing ones being all-zero columns removed
+    when the record was loaded.
+    """
+    available_columns = set(available_columns)
+    channels = {}
+    for definition in definitions:
+        if '{i}' in definition.name:
+            for i in range(1, coil_count + 1):
+                expression = definition.expression.replace('{i}', str(i))
+                if _references(expression) <= available_columns:
+                    channels[definition.name.replace('{i}', str(i))] = (expression, definition.unit)
+        elif len(_references(definition.expression) & available_columns) > 0:
+            channels[definition.name] = (definition.expression, definition.unit)
+    return {name: channel for (name, channel) in channels.items() if name not in available_columns}
+
+
+def channel_columns(columns: list, channels: dict) -> list:
+    """columns to read for columns to be selected, the channels among them being replaced by their references"""
+    needed = []
+    for column in columns:
+        if column in channels:
+            needed.extend(sorted(_references(channels[column][0])))
+        else:
+            needed.append(column)
+    return list(dict.fromkeys(needed))
+
+
+def channel_key(record_key: str, name: str, expression: str) -> str:
+    """cache key of a channel computed for a record, changing with its expression"""
+    return f"{record_key}:{name}:{hashlib.sha256(expression.encode()).hexdigest()}"
+
+
+def evaluate_channel(data: pd.DataFrame, name: str, expression: str) -> pd.DataFrame:
+    """one column frame holding the channel, infinite values being replaced by NaN"""
+    frame = pd.DataFrame({
+        column: data[column] if column in data.columns else 0.0 for column in _references(expression)
+    }, index=data.index)
+    with np.errstate(all='ignore'):
+        values = _evaluate(_parse(expression), frame)
+    values = pd.Series(values, index=data.index).astype(np.float64).replace([np.inf, -np.inf], np.nan)
+    return pd.DataFrame({name: values.to_numpy()}, index=data.index)
@@ -0,0 +1,93 @@
+import enum
+
+import numpy as np
+
+
+class SamplingMode(str, enum.Enum):
+    LTTB = 'lttb'
+    MINMAX = 'minmax'
+    STRIDE = 'stride'
+
+
+def as_float_array(values) -> np.ndarray:
+    """numeric view of a series usable as a chart axis (datetimes become nanoseconds since epoch)"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def _is_numeric(values) -> bool:
+    dtype = np.asarray(values).dtype
+    return np.issubdtype(dtype, np.number) or np.issubdtype(dtype, np.datetime64)
+
+
+def stride(y: np.ndarray, n_out: int) -> np.ndarray:
+    """keep every Nth point"""
+    return np.arange(0, len(y), max(1, round(len(y) / n_out)))
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """keep the minimum and the maximum of n_out / 2 equally sized buckets"""
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    buckets = np.repeat(np.arange(n_buckets), np.diff(edges))
+    # sorting by (bucket, value) puts each bucket minimum at its start and its maximum at its end
+    order = np.lexsort((y, buckets))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: keep the point of each bucket forming the largest triangle with the
+    point kept in the previous bucket and the average of the next one. First and last points are always kept."""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    next_x = np.append(avg_x[1:], x[n - 1])
+    next_y = np.append(avg_y[1:], y[n - 1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, n_out: int, mode: SamplingMode = SamplingMode.LTTB) -> np.ndarray:
+    """indices of the points of (x, y) to keep, NaN values of y are ignored"""
+    if not _is_numeric(y):
+        return stride(np.asarray(y), n_out)
+    # rows are taken as evenly spaced when x is not numeric (Date, Time)
+    x = as_float_array(x) if _is_numeric(x) else np.arange(len(x), dtype=np.float64)
+    y = as_float_array(y)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) < len(y):
+        return valid[downsample(x[valid], y[valid], n_out, mode)]
+
+    if mode == SamplingMode.LTTB:
+        return lttb(x, y, n_out)
+    elif mode == SamplingMode.MINMAX:
+        return minmax(y, n_out)
+    return stride(y, n_out)
+
+
+def downsample_series(data, x: str, y: list, n_out: int, mode: SamplingMode = SamplingMode.LTTB):
+    """downsample each y series independently and keep the union of the selected rows"""
+    indices = [downsample(data[x].values, data[y_value].values, n_out, mode) for y_value in y]
+    return data.iloc[np.unique(np.concatenate(indices))] if len(indices) > 0 else data
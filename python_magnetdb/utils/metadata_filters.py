@@ -0,0 +1,60 @@
+import json
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q, QuerySet
+
+metadata_param_pattern = re.compile(r'^metadata\[([^\[\]]+)\]$')
+
+
+def _nested(path: str, value) -> dict:
+    """{'a': {'b': value}} for the path 'a.b'"""
+    for key in reversed(path.split('.')):
+        if key == '':
+            raise ValueError(f"Invalid metadata key: {path}")
+        value = {key: value}
+    return value
+
+
+def _candidate_values(value: str) -> list:
+    """a query string value matches both the string and the JSON scalar it spells (30, true, null...)"""
+    values = [value]
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return values
+    if not isinstance(parsed, (dict, list, str)):
+        values.append(parsed)
+    return values
+
+
+def filter_by_metadata(db_query: QuerySet, query_params, contains: str = None, has_keys: list = None) -> QuerySet:
+    """restrict a query on a model with a metadata JSON field
+
+    Filters are expressed as containment (@>) and key existence (?) so they are answered by the GIN index of the
+    metadata column:
+    - metadata[campaign]=2024-06, metadata[magnet.type]=bitter (dotted keys reach nested objects)
+    - metadata_contains={"campaign": "2024-06", "tags": ["calibration"]}
+    - metadata_has_key[]=campaign
+    """
+    for (param, value) in query_params.multi_items():
+        match = metadata_param_pattern.match(param)
+        if match is None:
+            continue
+        db_query = db_query.filter(reduce(or_, [
+            Q(metadata__contains=_nested(match.group(1), candidate)) for candidate in _candidate_values(value)
+        ]))
+
+    if contains is not None:
+        try:
+            contains = json.loads(contains)
+        except ValueError:
+            raise ValueError("metadata_contains must be a JSON object")
+        if not isinstance(contains, dict):
+            raise ValueError("metadata_contains must be a JSON object")
+        db_query = db_query.filter(metadata__contains=contains)
+
+    if has_keys is not None and len(has_keys) > 0:
+        db_query = db_query.filter(metadata__has_keys=has_keys)
+    return db_query
@@ -0,0 +1,135 @@
+import math
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from os import getenv
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from python_magnetdb.utils.record_time_axis import add_time_axis, parse_timestamps, spread_duplicate_seconds
+from python_magnetdb.utils.storage_codec import StorageCodec
+
+# raw record files are plain columnar text, they are stored compressed when a codec is configured
+record_storage_codec = StorageCodec(getenv('RECORDS_STORAGE_CODEC')) if getenv('RECORDS_STORAGE_CODEC') else None
+
+
+def read_record_txt(file) -> pd.DataFrame:
+    """parse a raw acquisition file (whitespace separated, one title line) and add the t/timestamp columns"""
+    data = pd.read_csv(file, sep=r'\s+', skiprows=1)
+    # cleanup: remove empty columns
+    data = data.loc[:, (data != 0.0).any(axis=0)].copy()
+    return add_time_axis(data)
+
+
+def read_record_chunk(file, t0=None) -> pd.DataFrame:
+    """parse rows appended to a live record (header line followed by rows, no title line), t being counted from t0
+    or from the first row when t0 is None
+
+    The rows of a second may be split across chunks, they are not spread inside it: t and timestamp are whole
+    seconds until the chunks are put back together (see spread_duplicate_seconds).
+    """
+    data = pd.read_csv(file, sep=r'\s+')
+    if 'Date' not in data.columns or 'Time' not in data.columns:
+        raise ValueError("Date and Time columns are required")
+    if len(data) == 0:
+        raise ValueError("No rows to append")
+    timestamps = parse_timestamps(data['Date'], data['Time'], spread_duplicates=False)
+    data['t'] = (timestamps - (timestamps.iloc[0] if t0 is None else t0)).dt.total_seconds()
+    data['timestamp'] = timestamps
+    return data
+
+
+def write_record_txt(data: pd.DataFrame, path: str, title: str):
+    """write rows in the acquisition file format read by read_record_txt"""
+    with open(path, 'w') as f:
+        f.write(f"{title}\n")
+        data.drop(columns=['t', 'timestamp']).to_csv(f, sep='\t', index=False)
+
+
+def build_offset_index(raw: bytes, data: pd.DataFrame, max_entries: int = 256):
+    """sparse index of the byte offset of every Nth row of a raw acquisition file along with its t
+
+    Returns None when the rows of the file cannot be matched with its lines (blank lines for instance).
+    """
+    line_starts = np.concatenate([[0], np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == ord('\n')) + 1])
+    line_starts = line_starts[line_starts < len(raw)]
+    # the first two lines are the title and the header
+    row_starts = line_starts[2:]
+    if len(row_starts) != len(data) or len(data) == 0:
+        return None
+    header = raw[line_starts[1]:row_starts[0]].decode().split()
+    step = max(1024, math.ceil(len(data) / max_entries))
+    return {
+        'step': step,
+        'header': header,
+        'columns': [column for column in data.columns if column not in ['t', 'timestamp']],
+        't0': data['timestamp'].iloc[0].isoformat(),
+        't': data['t'].iloc[::step].tolist(),
+        'offset': row_starts[::step].tolist(),
+        'size': len(raw),
+    }
+
+
+def offset_range(index: dict, x_min: float, x_max: float):
+    """(offset, length) of the part of the raw file holding the rows with x_min <= t <= x_max
+
+    The part covers the whole seconds of x_min and x_max so the rows sharing them can be spread as in a full parse.
+    """
+    start = max(0, bisect_right(index['t'], x_min - 1) - 1)
+    end = bisect_left(index['t'], x_max + 1, lo=start) + 1
+    offset = index['offset'][start]
+    end_offset = index['offset'][end] if end < len(index['offset']) else index['size']
+    return offset, end_offset - offset
+
+
+def read_record_range(stream, index: dict, x_min: float, x_max: float, chunksize: int = 8192) -> pd.DataFrame:
+    """parse the rows of a raw file part (see offset_range) with x_min <= t <= x_max, stopping as soon as t goes
+    past x_max
+
+    Rows are parsed at second resolution and the seconds of the window spread once all their rows are read, giving
+    the t of a parse of the whole file wherever the part starts.
+    """
+    t0 = pd.Timestamp(index['t0'])
+    columns = index['columns']
+    chunks = []
+    reader = pd.read_csv(stream, sep=r'\s+', header=None, names=index['header'], chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[columns]
+        timestamps = parse_timestamps(chunk['Date'], chunk['Time'], spread_duplicates=False)
+        seconds = (timestamps - t0).dt.total_seconds()
+        # the part starts in a second before the one of x_min, the rows of that second may be incomplete
+        selected = (seconds >= math.floor(x_min)) & (seconds <= x_max)
+        chunks.append(chunk[selected].assign(timestamp=timestamps[selected]))
+        if seconds.iloc[-1] > x_max:
+            break
+    reader.close()
+    if len(chunks) == 0:
+        return pd.DataFrame(columns=columns + ['t', 'timestamp'])
+    data = pd.concat(chunks, ignore_index=True)
+    timestamps = spread_duplicate_seconds(data['timestamp'])
+    data = data.assign(t=(timestamps - t0).dt.total_seconds(), timestamp=timestamps)
+    return data[(data['t'] >= x_min) & (data['t'] <= x_max)].reset_index(drop=True)
+
+
+def write_record_parquet(data: pd.DataFrame, path: str):
+    data.to_parquet(path, engine='pyarrow', index=False)
+
+
+def read_record_parquet(file, columns=None) -> pd.DataFrame:
+    file.seek(0)
+    return pd.read_parquet(file, engine='pyarrow', columns=columns)
+
+
+def read_record_parquet_columns(file) -> list:
+    """columns of a parquet sidecar, only its footer is read"""
+    file.seek(0)
+    return pq.read_schema(file).names
+
+
+def extract_date_from_filename(filename):
+    for match in re.finditer(r".+_(\d{4}).(\d{2}).(\d{2})---(\d{2}):(\d{2}):(\d{2}).+", filename):
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)),
+                        int(match.group(4)), int(match.group(5)), int(match.group(6)))
+    return None
@@ -0,0 +1,149 @@
+import re
+from os import getenv
+
+import numpy as np
+import pandas as pd
+
+from python_magnetdb.models import RecordEventType
+
+event_column_pattern = re.compile(r'^(Idcct\d*|Field)$')
+# time window of the rolling median applied before differentiating, it removes the acquisition noise while
+# keeping the edges of a trip sharp
+smoothing_seconds = 2.0
+# ramps are found from the change of the smoothed series over this window, long enough for slow ramps to move by
+# much more than the noise
+slope_seconds = float(getenv('RECORD_EVENTS_SLOPE_SECONDS') or 30.0)
+# changes are significant above this many times the noise level of the column
+noise_factor = 5.0
+# slowest ramp detected on a noiseless series, as a fraction of the largest absolute value of the column per second
+ramp_rate = float(getenv('RECORD_EVENTS_RAMP_RATE') or 1e-5)
+trip_rate = 0.2
+# runs of a slope class shorter than this are absorbed by the surrounding runs (trips excepted)
+merge_seconds = 3.0
+min_duration = 5.0
+# ramps and trips must move by this fraction of the column scale, plateaus must be above it
+min_amplitude = 0.05
+# plateaus must stay within this fraction of the column scale (or the noise level when larger)
+plateau_tolerance = float(getenv('RECORD_EVENTS_PLATEAU_TOLERANCE') or 0.01)
+
+_FLAT, _UP, _DOWN, _TRIP = 0, 1, -1, -2
+
+
+def _runs(labels: np.ndarray) -> pd.DataFrame:
+    """first and last index of every run of identical labels"""
+    starts = np.flatnonzero(np.diff(labels, prepend=labels[0] - 1))
+    ends = np.append(starts[1:], len(labels)) - 1
+    return pd.DataFrame({'label': labels[starts], 'start': starts, 'end': ends})
+
+
+def _merge_short_runs(runs: pd.DataFrame, t: np.ndarray) -> pd.DataFrame:
+    """give the label of the previous run to runs too short to be meaningful, then join identical neighbours"""
+    duration = t[runs['end']] - t[runs['start']]
+    keep = (duration >= merge_seconds) | (runs['label'] == _TRIP)
+    if not keep.any():
+        return runs
+    runs = runs.assign(label=runs['label'].where(keep).ffill().bfill().astype(np.int64))
+    group = (runs['label'] != runs['label'].shift()).cumsum()
+    return runs.groupby(group).agg(label=('label', 'first'), start=('start', 'min'), end=('end', 'max'))
+
+
+def _noise_level(y: np.ndarray, smoothed: np.ndarray) -> float:
+    """robust standard deviation of the acquisition noise"""
+    residual = y - smoothed
+    return 1.4826 * float(np.median(np.abs(residual - np.median(residual))))
+
+
+def _trim_ramps(labels: np.ndarray, runs: pd.DataFrame, smoothed: np.ndarray, tolerance: float):
+    """the slope window blurs ramps by up to half its width on both sides, their ends are moved to where the series
+    actually leaves or reaches its level, the samples left out become flat again"""
+    for (label, start, end) in runs[runs['label'].isin([_UP, _DOWN])].itertuples(index=False):
+        segment = smoothed[start:end + 1] * label
+        moving = np.flatnonzero(segment > segment[0] + tolerance)
+        arrived = np.flatnonzero(segment >= segment[-1] - tolerance)
+        if len(moving) == 0:
+            # only caught the blur of a neighbouring trip or ramp
+            labels[start:end + 1] = _FLAT
+            continue
+        labels[start:start + max(moving[0] - 1, 0)] = _FLAT
+        labels[start + arrived[0] + 1:end + 1] = _FLAT
+
+
+def detect_column_events(t: np.ndarray, y: np.ndarray, column: str) -> list:
+    """ramps, plateaus and trips of a single series, t being strictly increasing seconds
+
+    Ramps are changes of the smoothed series over slope_seconds larger than the noise (or ramp_rate on noiseless
+    series), so slow ramps are found whatever their rate. Plateaus are the remaining runs staying within
+    plateau_tolerance of the scale, trips the sharp drops of the smoothed series.
+    """
+    valid = ~np.isnan(y)
+    (t, y) = (t[valid], y[valid])
+    if len(y) < 3:
+        return []
+    scale = np.max(np.abs(y))
+    if scale == 0:
+        return []
+
+    dt = np.median(np.diff(t))
+    window = max(1, int(round(smoothing_seconds / dt))) if dt > 0 else 1
+    smoothed = pd.Series(y).rolling(window, center=True, min_periods=1).median().to_numpy()
+    noise = _noise_level(y, smoothed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.nan_to_num(np.gradient(smoothed, t) / scale, nan=0.0, posinf=0.0, neginf=0.0)
+    half = slope_seconds / 2
+    change = np.interp(t + half, t, smoothed) - np.interp(t - half, t, smoothed)
+    threshold = max(noise_factor * noise, ramp_rate * scale * slope_seconds)
+    labels = np.select(
+        [rate < -trip_rate, change < -threshold, change > threshold], [_TRIP, _DOWN, _UP], default=_FLAT
+    )
+    _trim_ramps(labels, _merge_short_runs(_runs(labels), t), smoothed, noise_factor * noise)
+
+    runs = _merge_short_runs(_runs(labels), t)
+    start = runs['start'].to_numpy()
+    end = runs['end'].to_numpy()
+    label = runs['label'].to_numpy()
+    # a slope run is delimited by the samples around it, a plateau by its own samples
+    moving = label != _FLAT
+    first = np.where(moving, np.maximum(start - 1, 0), start)
+    last = np.where(moving, np.minimum(end + 1, len(y) - 1), end)
+    duration = t[last] - t[first]
+    amplitude = np.abs(y[last] - y[first])
+    mean = np.add.reduceat(y, start) / (end - start + 1)
+    spread = np.maximum.reduceat(smoothed, start) - np.minimum.reduceat(smoothed, start)
+
+    types = np.select([
+        (label == _FLAT) & (duration >= min_duration) & (np.abs(mean) >= min_amplitude * scale)
+        & (spread <= max(plateau_tolerance * scale, noise_factor * noise)),
+        (label == _UP) & (duration >= min_duration) & (amplitude >= min_amplitude * scale),
+        (label == _DOWN) & (duration >= min_duration) & (amplitude >= min_amplitude * scale),
+        (label == _TRIP) & (amplitude >= min_amplitude * scale),
+    ], [
+        RecordEventType.PLATEAU.value, RecordEventType.RAMP_UP.value,
+        RecordEventType.RAMP_DOWN.value, RecordEventType.TRIP.value,
+    ], default='')
+    return [{
+        'type': str(types[i]),
+        'column': column,
+        't_start': float(t[first[i]]),
+        't_end': float(t[last[i]]),
+        'start_value': float(y[first[i]]),
+        'end_value': float(y[last[i]]),
+        'mean_value': float(mean[i]),
+    } for i in np.flatnonzero(types != '')]
+
+
+def detect_events(data: pd.DataFrame) -> list:
+    """events of the Idcct*/Field columns of a record, ordered by time"""
+    if len(data) == 0:
+        return []
+    t = data['t'].to_numpy(dtype=np.float64)
+    events = []
+    for column in data.columns:
+        if event_column_pattern.match(column) and pd.api.types.is_numeric_dtype(data[column]):
+            events.extend(detect_column_events(t, data[column].to_numpy(dtype=np.float64), column))
+    return sorted(events, key=lambda event: (event['t_start'], event['column']))
+
+
+def event_window(t_start: float, t_end: float, margin: float = 0.1):
+    """x_min/x_max of a chart window showing an event with some context around it"""
+    padding = max((t_end - t_start) * margin, 1.0)
+    return t_start - padding, t_end + padding
@@ -0,0 +1,65 @@
+import base64
+import enum
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from python_magnetdb.utils.downsampling import as_float_array
+
+arrow_media_type = 'application/vnd.apache.arrow.stream'
+
+
+class RecordFormat(str, enum.Enum):
+    JSON = 'json'
+    COLUMNAR = 'columnar'
+    ARROW = 'arrow'
+
+
+def _is_datetime(values) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(values)
+
+
+def encode_column(values, dtype) -> dict:
+    """little-endian typed array encoded in base64, datetimes are sent as milliseconds since epoch"""
+    array = as_float_array(values)
+    column = {'dtype': np.dtype(dtype).name, 'length': len(array)}
+    if _is_datetime(values):
+        array = array / 1e6
+        column['unit'] = 'ms'
+    column['data'] = base64.b64encode(array.astype(np.dtype(dtype).newbyteorder('<')).tobytes()).decode('ascii')
+    return column
+
+
+def to_columnar(points: pd.DataFrame, x: str, y: list, envelope: pd.DataFrame = None) -> dict:
+    return {
+        'x': encode_column(points[x], np.float64),
+        'y': {y_value: encode_column(points[y_value], np.float32) for y_value in y},
+        'envelope': {
+            y_value: {
+                'min': encode_column(envelope[f'{y_value}.min'], np.float32),
+                'max': encode_column(envelope[f'{y_value}.max'], np.float32),
+            } for y_value in y
+        } if envelope is not None else None,
+    }
+
+
+def to_arrow(points: pd.DataFrame, x: str, y: list, envelope: pd.DataFrame = None, metadata: dict = None) -> bytes:
+    """Arrow IPC stream with the x column, one float32 column per y and their envelope when available"""
+    if _is_datetime(points[x]):
+        arrays = {x: pa.array(points[x].values.astype('datetime64[ms]'), type=pa.timestamp('ms'))}
+    else:
+        arrays = {x: pa.array(as_float_array(points[x]), type=pa.float64())}
+    for y_value in y:
+        arrays[y_value] = pa.array(as_float_array(points[y_value]), type=pa.float32())
+        if envelope is not None:
+            for stat in ['min', 'max']:
+                arrays[f'{y_value}.{stat}'] = pa.array(as_float_array(envelope[f'{y_value}.{stat}']), type=pa.float32())
+    table = pa.table(arrays).replace_schema_metadata(
+        {key: json.dumps(value) for (key, value) in (metadata or {}).items()}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
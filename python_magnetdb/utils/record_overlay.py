@@ -0,0 +1,44 @@
+import enum
+
+import numpy as np
+import pandas as pd
+
+
+class OverlayAlignment(str, enum.Enum):
+    START = 'start'
+    PEAK = 'peak'
+    FIELD = 'field'
+
+
+def alignment_offset(data: pd.DataFrame, y: str, align: OverlayAlignment, field: float = None) -> float:
+    """t of the row used as the origin of a record on the common time axis
+
+    start: first row, peak: maximum of y, field: first row where Field reaches the given value
+    (half of the record maximum when not given).
+    """
+    if len(data) == 0:
+        return 0.0
+    if align == OverlayAlignment.PEAK:
+        return float(data['t'].iloc[int(np.nanargmax(data[y].to_numpy()))])
+    elif align == OverlayAlignment.FIELD:
+        values = data['Field'].to_numpy()
+        threshold = field if field is not None else np.nanmax(values) / 2
+        reached = np.flatnonzero(values >= threshold)
+        return float(data['t'].iloc[reached[0]]) if len(reached) > 0 else float(data['t'].iloc[0])
+    return float(data['t'].iloc[0])
+
+
+def resample(series: dict, y: list, points: int):
+    """interpolate every (relative t, data) of series on a shared grid, NaN outside of each record range"""
+    ranges = [(t[0], t[-1]) for (t, _) in series.values() if len(t) > 0]
+    if len(ranges) == 0:
+        return np.array([]), {key: {y_value: np.array([]) for y_value in y} for key in series}
+    grid = np.linspace(min(start for (start, _) in ranges), max(end for (_, end) in ranges), points)
+    resampled = {}
+    for (key, (t, data)) in series.items():
+        resampled[key] = {
+            y_value: np.interp(grid, t, data[y_value].to_numpy(dtype=np.float64), left=np.nan, right=np.nan)
+            if len(t) > 0 else np.full(points, np.nan)
+            for y_value in y
+        }
+    return grid, resampled
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+pyramid_factor = 4
+pyramid_min_buckets = 64
+pyramid_row_group_size = 16384
+time_columns = ['t', 'timestamp']
+
+
+def _reduce(values: np.ndarray, edges: np.ndarray, counts: np.ndarray):
+    return (
+        np.minimum.reduceat(values, edges),
+        np.maximum.reduceat(values, edges),
+        np.add.reduceat(values, edges) / counts,
+    )
+
+
+def build_pyramid(data: pd.DataFrame) -> pd.DataFrame:
+    """min/max/mean of every numeric column over buckets of 4, 16, 64... rows
+
+    The x position of a bucket is its mean t, t_min/t_max delimit the time range it covers.
+    """
+    columns = [
+        column for column in data.columns
+        if column not in time_columns and pd.api.types.is_numeric_dtype(data[column])
+    ]
+    t = data['t'].to_numpy(dtype=np.float64)
+    values = {column: data[column].to_numpy(dtype=np.float64) for column in columns}
+
+    levels = []
+    bucket_size = pyramid_factor
+    while len(data) // bucket_size >= pyramid_min_buckets:
+        edges = np.arange(0, len(data), bucket_size)
+        counts = np.diff(np.append(edges, len(data)))
+        (t_min, t_max, t_mean) = _reduce(t, edges, counts)
+        level = {'bucket_size': np.full(len(edges), bucket_size), 't': t_mean, 't_min': t_min, 't_max': t_max}
+        for column in columns:
+            (level[f'{column}.min'], level[f'{column}.max'], level[f'{column}.mean']) = _reduce(values[column], edges, counts)
+        levels.append(pd.DataFrame(level))
+        bucket_size *= pyramid_factor
+    return pd.concat(levels, ignore_index=True) if len(levels) > 0 else pd.DataFrame()
+
+
+def write_pyramid(pyramid: pd.DataFrame, path: str):
+    """write each level as row groups of its own, of at most pyramid_row_group_size buckets, so a zoom only reads
+    the part of one level covering its window"""
+    table = pa.Table.from_pandas(pyramid, preserve_index=False)
+    with pq.ParquetWriter(path, table.schema) as writer:
+        for bucket_size in pyramid['bucket_size'].unique():
+            level = table.filter(pc.equal(table['bucket_size'], bucket_size))
+            writer.write_table(level, row_group_size=max(1, min(level.num_rows, pyramid_row_group_size)))
+
+
+def read_pyramid_columns(file) -> list:
+    """columns of the record the pyramid was built from, in their original order"""
+    file.seek(0)
+    names = pq.read_schema(file).names
+    columns = [name[:-len('.mean')] for name in names if name.endswith('.mean')]
+    return ['Date', 'Time'] + columns + time_columns
+
+
+def read_pyramid_level(file, x_min: float, x_max: float, y: list, n_points: int):
+    """coarsest level holding at least n_points buckets inside [x_min, x_max], None when raw data is needed"""
+    file.seek(0)
+    parquet = pq.ParquetFile(file)
+    columns = ['bucket_size', 't', 't_min', 't_max'] + [f'{y_value}.{stat}' for y_value in y for stat in ['min', 'max', 'mean']]
+    missing = [column for column in columns if column not in parquet.schema_arrow.names]
+    if len(missing) > 0:
+        return None
+
+    # row groups of each level with the time range they cover, levels written before they were split hold a
+    # single row group
+    names = parquet.schema_arrow.names
+    levels = {}
+    for row_group in range(parquet.num_row_groups):
+        metadata = parquet.metadata.row_group(row_group)
+        bucket_size = metadata.column(names.index('bucket_size')).statistics
+        t_min = metadata.column(names.index('t_min')).statistics
+        t_max = metadata.column(names.index('t_max')).statistics
+        levels.setdefault(bucket_size.min, []).append((row_group, metadata.num_rows, t_min.min, t_max.max))
+
+    for bucket_size in sorted(levels, reverse=True):
+        row_groups = [group for group in levels[bucket_size] if group[3] >= x_min and group[2] <= x_max]
+        # buckets are evenly spread in time, a level far too coarse for the window is not worth downloading
+        estimate = sum(
+            rows * (min(x_max, end) - max(x_min, start)) / (end - start) if end > start else rows
+            for (_, rows, start, end) in row_groups
+        )
+        if estimate < n_points / 2:
+            continue
+        level = parquet.read_row_groups([group[0] for group in row_groups], columns=columns).to_pandas()
+        level = level[(level['t_max'] >= x_min) & (level['t_min'] <= x_max)]
+        if len(level) >= n_points:
+            return level
+    return None
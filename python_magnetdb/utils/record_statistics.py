@@ -0,0 +1,55 @@
+import math
+import re
+
+import pandas as pd
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from python_magnetdb.models import RecordColumnStatistics
+from python_magnetdb.utils.record_pyramid import time_columns
+
+statistics_filter_pattern = re.compile(r'^(\w+)\.(min|max|mean|std|duration)(>=|<=|>|<|=)(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)$')
+statistics_filter_lookups = {'>=': 'gte', '<=': 'lte', '>': 'gt', '<': 'lt', '=': 'exact'}
+
+
+def _float_or_none(value):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def compute_column_statistics(data: pd.DataFrame) -> list:
+    """min/max/mean/std of every numeric column along with the time range of the record"""
+    columns = [
+        column for column in data.columns
+        if column not in time_columns and pd.api.types.is_numeric_dtype(data[column])
+    ]
+    if len(data) == 0 or len(columns) == 0:
+        return []
+    aggregates = data[columns].agg(['min', 'max', 'mean', 'std'])
+    duration = float(data['t'].iloc[-1] - data['t'].iloc[0])
+    first_timestamp = timezone.make_aware(data['timestamp'].iloc[0].to_pydatetime())
+    last_timestamp = timezone.make_aware(data['timestamp'].iloc[-1].to_pydatetime())
+    return [{
+        'column': column,
+        'min': _float_or_none(aggregates.at['min', column]),
+        'max': _float_or_none(aggregates.at['max', column]),
+        'mean': _float_or_none(aggregates.at['mean', column]),
+        'std': _float_or_none(aggregates.at['std', column]),
+        'duration': duration,
+        'first_timestamp': first_timestamp,
+        'last_timestamp': last_timestamp,
+    } for column in columns]
+
+
+def filter_by_statistics(db_query: QuerySet, filters: list) -> QuerySet:
+    """restrict a record query with filters like 'Field.max>=30' or 'Idcct1.max>25000'"""
+    for value in filters or []:
+        match = statistics_filter_pattern.match(value.replace(' ', ''))
+        if match is None:
+            raise ValueError(f"Invalid statistics filter: {value}")
+        (column, statistic, operator, threshold) = match.groups()
+        statistics = RecordColumnStatistics.objects.filter(
+            column=column, **{f"{statistic}__{statistics_filter_lookups[operator]}": float(threshold)}
+        )
+        db_query = db_query.filter(id__in=statistics.values('record_id'))
+    return db_query
@@ -0,0 +1,47 @@
+import pandas as pd
+
+time_format = "%Y.%m.%d %H:%M:%S"
+
+
+def parse_timestamps(dates: pd.Series, times: pd.Series, spread_duplicates: bool = True) -> pd.Series:
+    """parse the Date/Time columns of a record in one vectorized pass
+
+    Acquisitions are sampled at one second resolution: rows sharing the same second are spread evenly
+    inside it so that the time axis stays strictly increasing. A Time going backward by more than
+    half a day while Date is unchanged is treated as a midnight rollover.
+    """
+    dates = dates.astype(str).reset_index(drop=True)
+    timestamps = pd.to_datetime(dates + " " + times.astype(str).reset_index(drop=True), format=time_format)
+
+    date_runs = (dates != dates.shift()).cumsum()
+    rollovers = (timestamps.diff() < -pd.Timedelta(hours=12)) & (date_runs == date_runs.shift())
+    if rollovers.any():
+        timestamps = timestamps + pd.to_timedelta(rollovers.astype(int).groupby(date_runs).cumsum(), unit='D')
+
+    if spread_duplicates:
+        timestamps = spread_duplicate_seconds(timestamps)
+
+    timestamps.index = times.index
+    return timestamps
+
+
+def spread_duplicate_seconds(timestamps: pd.Series) -> pd.Series:
+    """timestamps with the rows sharing a second spread evenly inside it, the spread of parse_timestamps
+
+    The rows of a second must all be given for their offsets to match the ones of a parse of the whole record.
+    """
+    groups = timestamps.groupby(timestamps)
+    return timestamps + pd.to_timedelta(groups.cumcount() / groups.transform('size'), unit='s')
+
+
+def elapsed_seconds(timestamps: pd.Series) -> pd.Series:
+    """seconds elapsed since the first row"""
+    return (timestamps - timestamps.iloc[0]).dt.total_seconds()
+
+
+def add_time_axis(data: pd.DataFrame, spread_duplicates: bool = True) -> pd.DataFrame:
+    """add the t (seconds since the first row) and timestamp columns built from Date/Time"""
+    timestamps = parse_timestamps(data['Date'], data['Time'], spread_duplicates=spread_duplicates)
+    data["t"] = elapsed_seconds(timestamps)
+    data["timestamp"] = timestamps
+    return data
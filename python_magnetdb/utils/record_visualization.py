@@ -1,3 +1,5 @@
+coil_count = 16
+
 columns = {
     'Date': "date d'acquisition",
     'Time': "heure d'acquisition",
@@ -27,7 +29,7 @@ columns = {
     'timestamp': 'date complète'
 }
 
-for i in range(16):
+for i in range(coil_count):
     columns[f'Icoil{i + 1}'] = 'A'
     columns[f'Ucoil{i + 1}'] = 'V'
     columns[f'DRcoil{i + 1}'] = '%'
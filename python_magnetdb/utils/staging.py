@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+
+from python_magnetdb.utils.storage_cache import StorageCache
+
+# concurrent downloads of a staging, keep it below S3_POOL_SIZE
+staging_workers = int(getenv('STAGING_WORKERS') or 8)
+
+
+class StagingPlan:
+    """attachments to write into a directory, collected first then downloaded concurrently
+
+    Attachments sharing a key are downloaded once, their other destinations are linked to the first one.
+    """
+
+    def __init__(self):
+        self.destinations = {}
+
+    def add(self, attachment, path: str):
+        if attachment is not None:
+            self.destinations[path] = attachment
+
+    def _fetch(self, key: str, paths: list) -> dict:
+        attachment = self.destinations[paths[0]]
+        started_at = time.perf_counter()
+        os.makedirs(os.path.dirname(paths[0]), exist_ok=True)
+        attachment.download(paths[0])
+        for path in paths[1:]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            StorageCache.link(paths[0], path)
+        return {
+            'key': key,
+            'filename': attachment.filename,
+            'paths': paths,
+            'bytes': os.path.getsize(paths[0]),
+            'seconds': time.perf_counter() - started_at,
+        }
+
+    def run(self, workers: int = staging_workers) -> list:
+        """download every attachment, returns the timings of each download"""
+        by_key = {}
+        for (path, attachment) in self.destinations.items():
+            by_key.setdefault(attachment.key, []).append(path)
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(by_key)))) as executor:
+            report = list(executor.map(lambda item: self._fetch(*item), by_key.items()))
+        seconds = time.perf_counter() - started_at
+
+        for entry in sorted(report, key=lambda entry: -entry['seconds']):
+            print(f"staged {entry['filename']} ({entry['bytes']} bytes) in {entry['seconds']:.2f}s")
+        print(f"staged {len(self.destinations)} files ({len(report)} downloads, "
+              f"{sum(entry['bytes'] for entry in report)} bytes) in {seconds:.2f}s")
+        return report
@@ -0,0 +1,107 @@
+import errno
+import fcntl
+import os
+import shutil
+import time
+import uuid
+from os import getenv
+
+# ioctl cloning a file on copy-on-write filesystems (btrfs, xfs), from linux/fs.h
+FICLONE = 0x40049409
+# fills interrupted before this age are left alone, they may still be running
+stale_fill_seconds = 3600
+
+
+def _reflink(source: str, destination: str):
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+class StorageCache:
+    """size bounded disk cache of stored objects, keyed by their content hash
+
+    A key always designates the same content so entries never need to be invalidated. Entries are filled through a
+    temporary file renamed in place, which is atomic for concurrent workers sharing the directory, and are made
+    read-only since they are handed out as hardlinks when the filesystem cannot clone them. Least recently used
+    entries (by mtime, refreshed on every hit) are evicted under an exclusive lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'tmp'), exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, 'objects', key[:2], key)
+
+    def fetch(self, key: str, fill, destination: str):
+        """put the content of key at destination, fill(path) writes it to path on a miss"""
+        cached = self.path(key)
+        try:
+            os.utime(cached)
+            return self.link(cached, destination)
+        except FileNotFoundError:
+            # missing, or evicted by another worker right after the lookup
+            pass
+
+        temp_path = os.path.join(self.directory, 'tmp', f"{key}.{uuid.uuid4()}")
+        try:
+            fill(temp_path)
+            os.chmod(temp_path, 0o444)
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            # the cached copy is linked before being published so eviction cannot race with it
+            self.link(temp_path, destination)
+            os.replace(temp_path, cached)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    @staticmethod
+    def link(cached: str, destination: str):
+        """reflink when the filesystem supports it, hardlink when on the same filesystem, copy otherwise"""
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            return _reflink(cached, destination)
+        except OSError:
+            if os.path.exists(destination):
+                os.remove(destination)
+        try:
+            return os.link(cached, destination)
+        except OSError as err:
+            if err.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+        shutil.copyfile(cached, destination)
+
+    def evict(self):
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            now = time.time()
+            with os.scandir(os.path.join(self.directory, 'tmp')) as entries:
+                for entry in entries:
+                    if entry.stat().st_mtime < now - stale_fill_seconds:
+                        os.remove(entry.path)
+
+            entries = []
+            objects = os.path.join(self.directory, 'objects')
+            for prefix in os.listdir(objects):
+                with os.scandir(os.path.join(objects, prefix)) as prefix_entries:
+                    for entry in prefix_entries:
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for (_, size, _) in entries)
+            for (_, size, path) in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+storage_cache = StorageCache(
+    getenv('STORAGE_CACHE_DIR'), int(getenv('STORAGE_CACHE_MAX_BYTES') or 10 * 1024 * 1024 * 1024)
+) if getenv('STORAGE_CACHE_DIR') else None
@@ -0,0 +1,55 @@
+import enum
+import gzip
+import shutil
+
+chunk_size = 64 * 1024
+
+
+class StorageCodec(str, enum.Enum):
+    GZIP = 'gzip'
+
+    @classmethod
+    def choices(cls):
+        return [(item.value, item.name) for item in cls]
+
+
+def compress_file(codec: StorageCodec, source: str, destination: str):
+    if codec == StorageCodec.GZIP:
+        with open(source, 'rb') as src, gzip.open(destination, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, chunk_size)
+    else:
+        raise ValueError(f"Unsupported codec: {codec}")
+
+
+class DecompressedObject(gzip.GzipFile):
+    """file-like view of the original bytes of a compressed object, releasing its connection once closed"""
+
+    def __init__(self, response):
+        super().__init__(fileobj=response, mode='rb')
+        self.response = response
+
+    def __iter__(self):
+        return self.stream()
+
+    def stream(self, amt: int = chunk_size):
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def release_conn(self):
+        self.response.release_conn()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.response.close()
+            self.response.release_conn()
+
+
+def decompress(codec: StorageCodec, response):
+    if codec == StorageCodec.GZIP:
+        return DecompressedObject(response)
+    raise ValueError(f"Unsupported codec: {codec}")
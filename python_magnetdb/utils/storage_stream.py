@@ -0,0 +1,94 @@
+import hashlib
+import io
+import zlib
+
+from python_magnetdb.utils.storage_codec import StorageCodec, chunk_size
+
+
+class HashingReader:
+    """readable stream hashing the bytes of a source as they are consumed, optionally compressing them
+
+    The hash and size are computed over the original bytes so a content is stored under the same key whatever the
+    codec it is stored with.
+    """
+
+    def __init__(self, source, codec: StorageCodec = None):
+        self.source = source
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.stored_size = 0
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if codec == StorageCodec.GZIP else None
+        self.buffer = bytearray()
+        self.eof = False
+
+    def _fill(self, size: int):
+        while not self.eof and len(self.buffer) < size:
+            chunk = self.source.read(max(size, chunk_size))
+            if not chunk:
+                self.eof = True
+                if self.compressor is not None:
+                    self.buffer += self.compressor.flush()
+                break
+            self.digest.update(chunk)
+            self.size += len(chunk)
+            self.buffer += self.compressor.compress(chunk) if self.compressor is not None else chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            while not self.eof:
+                self._fill(len(self.buffer) + chunk_size)
+            size = len(self.buffer)
+        else:
+            self._fill(size)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.stored_size += len(data)
+        return data
+
+    @property
+    def key(self) -> str:
+        return self.digest.hexdigest()
+
+
+class RangedReader(io.RawIOBase):
+    """seekable stream over a stored object, each read fetching only the bytes asked for with a ranged request
+
+    Meant to be wrapped in an io.BufferedReader, so columnar formats (parquet footers, row groups) can be read
+    without downloading the whole object.
+    """
+
+    def __init__(self, attachment, size: int):
+        self.attachment = attachment
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        response = self.attachment.download_range(self.position, length)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
@@ -8,6 +8,16 @@ from celery import Celery
 from python_magnetdb.models import Simulation, Server
 
 app = Celery('tasks', broker=os.getenv('REDIS_ADDR') or 'redis://localhost:6379/0')
+app.conf.beat_schedule = {
+    'compact-live-records': {
+        'task': 'python_magnetdb.worker.compact_live_records',
+        'schedule': float(os.getenv('RECORD_COMPACTION_INTERVAL') or 300),
+    },
+    'gc-storage': {
+        'task': 'python_magnetdb.worker.gc_storage',
+        'schedule': float(os.getenv('STORAGE_GC_INTERVAL') or 24 * 3600),
+    },
+}
 
 
 @app.task
@@ -24,3 +34,15 @@ def run_simulation(simulation_id, server_id, cores):
 def run_simulation_setup(simulation_id):
     from .actions.run_simulation_setup import run_simulation_setup
     return run_simulation_setup(Simulation.objects.get(id=simulation_id))
+
+
+@app.task
+def compact_live_records():
+    from .actions.live_record import compact_live_records
+    return compact_live_records()
+
+
+@app.task
+def gc_storage():
+    from .actions.gc_storage import collect_garbage
+    return collect_garbage()